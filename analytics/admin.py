@@ -7,7 +7,7 @@ from django.db.models import Count, Sum
 
 from .models import (
     AnalyticsEvent, SalesAnalytics, ProductAnalytics, 
-    CustomerAnalytics, AnalyticsDashboard, AnalyticsWidget
+    CustomerAnalytics, AnalyticsDashboard, AnalyticsWidget, SearchQueryStats
 )
 from .admin_views import get_admin_dashboard_context
 
@@ -103,6 +103,50 @@ class AnalyticsWidgetAdmin(admin.ModelAdmin):
         return super().get_queryset(request).select_related('dashboard')
 
 
+class ZeroResultsFilter(admin.SimpleListFilter):
+    title = 'results'
+    parameter_name = 'results'
+    
+    def lookups(self, request, model_admin):
+        return [('none', 'Last search found nothing'), ('some', 'Last search found products')]
+    
+    def queryset(self, request, queryset):
+        if self.value() == 'none':
+            return queryset.filter(last_result_count=0)
+        if self.value() == 'some':
+            return queryset.filter(last_result_count__gt=0)
+        return queryset
+
+
+@admin.register(SearchQueryStats)
+class SearchQueryStatsAdmin(admin.ModelAdmin):
+    list_display = ['query', 'searches', 'results_badge', 'zero_rate', 'clicks', 'ctr', 'last_searched_at']
+    list_filter = [ZeroResultsFilter, 'last_searched_at']
+    search_fields = ['query']
+    readonly_fields = [
+        'query', 'searches', 'zero_results', 'clicks', 'last_result_count',
+        'last_searched_at', 'created_at', 'updated_at',
+    ]
+    ordering = ['-searches']
+    
+    def has_add_permission(self, request):
+        return False
+    
+    @admin.display(description='Last results', ordering='last_result_count')
+    def results_badge(self, obj):
+        if obj.last_result_count == 0:
+            return format_html('<span style="color:#c0392b;font-weight:bold;">{}</span>', 'No results')
+        return obj.last_result_count
+    
+    @admin.display(description='Zero-result rate')
+    def zero_rate(self, obj):
+        return f"{obj.zero_result_rate:.1f}%"
+    
+    @admin.display(description='Click-through')
+    def ctr(self, obj):
+        return f"{obj.click_through_rate:.1f}%"
+
+
 # Create custom admin site instance
 custom_admin_site = CustomAdminSite(name='custom_admin')
 custom_admin_site.site_header = "ShopAway Analytics Admin"
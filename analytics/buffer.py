@@ -0,0 +1,169 @@
+"""Off-request, batched writes of analytics events.
+
+Views hand unsaved ``AnalyticsEvent`` rows to ``record``; a daemon thread per
+process bulk-inserts them every ``FLUSH_INTERVAL`` seconds (or sooner once
+``MAX_EVENTS`` are queued) and folds search events into ``SearchQueryStats``.
+Events still queued when the process exits are flushed by an ``atexit`` hook;
+a hard kill loses at most one interval of events.
+"""
+import atexit
+import logging
+import threading
+from collections import defaultdict
+
+from django.conf import settings
+from django.db import DatabaseError, connections, transaction
+from django.db.models import F
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from .models import AnalyticsEvent, SearchQueryStats
+
+logger = logging.getLogger(__name__)
+
+QUERY_MAX_LENGTH = 200
+
+
+def _buffer_settings():
+    return getattr(settings, 'ANALYTICS_BUFFER', {}) or {}
+
+
+def update_search_stats(events):
+    """Add the searches, zero-result searches and clicks in ``events`` to ``SearchQueryStats``."""
+    totals = defaultdict(lambda: {'searches': 0, 'zero_results': 0, 'clicks': 0, 'last': None})
+    for event in events:
+        if event.event_type != 'search' or not event.metadata.get('query'):
+            continue
+        row = totals[event.metadata['query']]
+        if event.metadata.get('action') == 'click':
+            row['clicks'] += 1
+        else:
+            results = event.metadata.get('results', 0)
+            row['searches'] += 1
+            row['zero_results'] += results == 0
+            row['last'] = (results, parse_datetime(event.metadata.get('at') or ''))
+    if not totals:
+        return
+    with transaction.atomic():
+        SearchQueryStats.objects.bulk_create(
+            [SearchQueryStats(query=query) for query in totals], ignore_conflicts=True,
+        )
+        # Increment in SQL so concurrent workers never overwrite each other's counts
+        for query, row in totals.items():
+            updates = {
+                'searches': F('searches') + row['searches'],
+                'zero_results': F('zero_results') + row['zero_results'],
+                'clicks': F('clicks') + row['clicks'],
+                'updated_at': timezone.now(),
+            }
+            if row['last']:
+                updates['last_result_count'] = row['last'][0]
+                updates['last_searched_at'] = row['last'][1] or timezone.now()
+            SearchQueryStats.objects.filter(query=query).update(**updates)
+
+
+def write_events(events):
+    AnalyticsEvent.objects.bulk_create(events, batch_size=500)
+    update_search_stats(events)
+
+
+class EventBuffer:
+    def __init__(self):
+        self._events = []
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._thread = None
+
+    def add(self, event):
+        config = _buffer_settings()
+        if not config.get('ENABLED', True):
+            self._write([event])
+            return
+        with self._lock:
+            self._events.append(event)
+            full = len(self._events) >= int(config.get('MAX_EVENTS', 200))
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name='analytics-buffer', daemon=True)
+                self._thread.start()
+        if full:
+            self._wake.set()
+
+    def _run(self):
+        interval = float(_buffer_settings().get('FLUSH_INTERVAL', 5.0))
+        while True:
+            self._wake.wait(interval)
+            self._wake.clear()
+            self.flush()
+            # This thread's connection would otherwise stay open between flushes
+            connections.close_all()
+
+    def flush(self):
+        with self._lock:
+            events, self._events = self._events, []
+        if events:
+            self._write(events)
+        return len(events)
+
+    def _write(self, events):
+        try:
+            write_events(events)
+        except DatabaseError:
+            logger.exception("Dropped %d analytics events", len(events))
+
+
+_buffer = EventBuffer()
+atexit.register(_buffer.flush)
+
+
+def record(event):
+    """Queue an unsaved ``AnalyticsEvent`` for the next bulk insert."""
+    _buffer.add(event)
+
+
+def flush():
+    return _buffer.flush()
+
+
+def normalize_query(query):
+    """Case- and spacing-insensitive form of ``query``; word order is kept so it reads naturally."""
+    return ' '.join((query or '').lower().split())[:QUERY_MAX_LENGTH]
+
+
+def _search_event(request, **fields):
+    from .views import get_client_ip
+
+    return AnalyticsEvent(
+        event_type='search',
+        user=request.user if request.user.is_authenticated else None,
+        session_id=request.session.session_key,
+        page_url=request.build_absolute_uri()[:500],
+        referrer=(request.META.get('HTTP_REFERER') or '')[:500] or None,
+        user_agent=request.META.get('HTTP_USER_AGENT'),
+        ip_address=get_client_ip(request),
+        **fields,
+    )
+
+
+def record_search(request, query, result_count):
+    """Record a search for ``query`` that returned ``result_count`` products."""
+    normalized = normalize_query(query)
+    if not normalized:
+        return
+    record(_search_event(request, metadata={
+        'query': normalized, 'action': 'query', 'results': result_count, 'at': timezone.now().isoformat(),
+    }))
+
+
+def record_search_click(request, query, product):
+    """Record that a result for ``query`` was opened."""
+    normalized = normalize_query(query)
+    if not normalized:
+        return
+    record(_search_event(
+        request,
+        product_id=str(product.pk),
+        product_name=product.name,
+        product_category=product.category.name if product.category_id else None,
+        product_price=product.price,
+        metadata={'query': normalized, 'action': 'click'},
+    ))
@@ -303,3 +303,35 @@ class AnalyticsWidget(models.Model):
     
     def __str__(self):
         return f"{self.dashboard.name} - {self.name}"
+
+
+class SearchQueryStats(models.Model):
+    """Search traffic aggregated per normalized query"""
+    
+    query = models.CharField(max_length=200, unique=True)
+    searches = models.PositiveIntegerField(default=0)
+    zero_results = models.PositiveIntegerField(default=0)
+    clicks = models.PositiveIntegerField(default=0)
+    last_result_count = models.IntegerField(default=0)
+    last_searched_at = models.DateTimeField(blank=True, null=True)
+    
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        ordering = ['-searches']
+        verbose_name_plural = 'search query stats'
+        indexes = [
+            models.Index(fields=['-searches']),
+        ]
+    
+    def __str__(self):
+        return f"{self.query} ({self.searches})"
+    
+    @property
+    def zero_result_rate(self):
+        return (self.zero_results / self.searches) * 100 if self.searches else 0
+    
+    @property
+    def click_through_rate(self):
+        return (self.clicks / self.searches) * 100 if self.searches else 0
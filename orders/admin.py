@@ -6,7 +6,7 @@ from django.conf import settings
 from pathlib import Path
 from reportlab.lib.pagesizes import A4
 from reportlab.pdfgen import canvas
-from .models import Order, OrderItem, CourierLog
+from .models import Order, OrderItem, CourierLog, EmailOutbox, PaymentNotification
 from .steadfast import SteadfastClient
 
 
@@ -413,3 +413,19 @@ class OrderItemAdmin(admin.ModelAdmin):
 class CourierLogAdmin(admin.ModelAdmin):
     list_display = ('order', 'action', 'created_at')
     readonly_fields = ('order', 'action', 'raw_payload', 'created_at')
+
+
+@admin.register(EmailOutbox)
+class EmailOutboxAdmin(admin.ModelAdmin):
+    list_display = ('id', 'to_email', 'subject', 'status', 'attempts', 'next_attempt_at', 'sent_at')
+    list_filter = ('status',)
+    search_fields = ('to_email', 'subject', 'order__id')
+    readonly_fields = ('order', 'attempts', 'last_error', 'created_at', 'sent_at')
+
+
+@admin.register(PaymentNotification)
+class PaymentNotificationAdmin(admin.ModelAdmin):
+    list_display = ('tran_id', 'order', 'gateway_status', 'source', 'status', 'attempts', 'created_at')
+    list_filter = ('status', 'source', 'gateway_status')
+    search_fields = ('tran_id', 'val_id', 'order__id')
+    readonly_fields = ('order', 'payload', 'attempts', 'last_error', 'created_at', 'processed_at')
@@ -0,0 +1,111 @@
+"""Atomic checkout: turn a cart into an Order without overselling.
+
+Everything happens in one transaction. The cart's products are locked with
+``select_for_update`` in primary-key order, so concurrent checkouts queue
+instead of deadlocking. Each stock decrement is also a conditional ``F()``
+update (``stock >= qty``), which keeps SQLite safe too: it ignores row locks
+but serializes writers. On SQLite the transaction must take the write lock
+when it begins (``transaction_mode: IMMEDIATE`` in settings); otherwise
+concurrent checkouts fail to upgrade their read lock with "database is
+locked". Order lines go in with a single ``bulk_create``.
+
+Bulk updates skip model signals, so the listings' stock columns are synced in
+the same transaction; nothing the search index holds changes. The catalog
+version is bumped after commit only when a product's stock bucket changed
+(e.g. it sold out), since every bump invalidates all catalog caches and ETags;
+listing cards show the bucket rather than the count for that reason.
+The order confirmation email is queued in the same transaction
+(``orders.outbox``).
+"""
+import logging
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from products import listings
+from products.caching import bump_catalog_version
+from products.models import Product
+
+from . import outbox
+from .models import Order, OrderItem
+
+logger = logging.getLogger(__name__)
+
+
+class OutOfStock(Exception):
+    """Raised (and the transaction rolled back) when lines cannot be filled.
+
+    ``shortages`` maps each short SKU to the quantity still available.
+    """
+
+    def __init__(self, shortages):
+        self.shortages = shortages
+        super().__init__(', '.join(f'{sku}: {left} left' for sku, left in shortages.items()))
+
+
+def _bump_catalog_version():
+    # Runs after commit: the order stands whatever happens here
+    try:
+        bump_catalog_version()
+    except Exception:
+        logger.exception('Could not bump the catalog version after checkout')
+
+
+def place_order(quantities, *, partial=False, **order_fields):
+    """Create an order for ``{sku: qty}`` at current prices and take the stock.
+
+    Unknown or inactive SKUs are skipped. When stock is short the whole order is
+    rejected with ``OutOfStock``, unless ``partial`` is set: then short lines are
+    filled with what is left and empty lines dropped. Returns ``(order, filled)``
+    where ``filled`` is ``{sku: qty}`` actually ordered.
+    """
+    with transaction.atomic():
+        products = list(
+            Product.objects.select_for_update()
+            .filter(sku__in=list(quantities), active=True)
+            .order_by('pk')
+        )
+        filled, shortages = {}, {}
+        for p in products:
+            wanted = int(quantities[p.sku])
+            if wanted <= 0:
+                continue
+            if p.stock < wanted:
+                shortages[p.sku] = max(p.stock, 0)
+                wanted = max(p.stock, 0)
+            if wanted:
+                filled[p.sku] = wanted
+        if shortages and not partial:
+            raise OutOfStock(shortages)
+        if not filled:
+            raise OutOfStock(shortages)
+
+        lines = [p for p in products if p.sku in filled]
+        now = timezone.now()
+        for p in lines:
+            qty = filled[p.sku]
+            taken = Product.objects.filter(pk=p.pk, stock__gte=qty).update(
+                stock=F('stock') - qty, updated_at=now,
+            )
+            if not taken:
+                # Only reachable where row locks are not honoured; roll everything back
+                p.refresh_from_db(fields=['stock'])
+                raise OutOfStock({p.sku: max(p.stock, 0)})
+
+        order = Order.objects.create(
+            total=sum((p.price * filled[p.sku] for p in lines), Decimal('0')),
+            **order_fields,
+        )
+        OrderItem.objects.bulk_create([
+            OrderItem(order=order, product=p, qty=filled[p.sku], price=p.price) for p in lines
+        ])
+        # Queued in this transaction; `manage.py run_outbox` sends it after commit
+        outbox.enqueue_order_confirmation(order)
+        # Read back rather than subtract: SQLite does not honour the row locks
+        stock = dict(Product.objects.filter(pk__in=[p.pk for p in lines]).values_list('pk', 'stock'))
+        listings.sync_stock(stock)
+        if any(listings.stock_bucket(p.stock) != listings.stock_bucket(stock[p.pk]) for p in lines):
+            transaction.on_commit(_bump_catalog_version)
+    return order, filled
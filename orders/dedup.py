@@ -0,0 +1,87 @@
+"""Duplicate-order detection.
+
+An order's ``double_entry_hash`` covers name, phone, address and total; the
+same hash again within ``ORDER_DEDUP["WINDOW_SECONDS"]`` is treated as an
+accidental resubmission.
+
+Recent hashes are kept as cache keys that expire with the window. ``claim``
+sets the key with ``cache.add``, which is atomic, so two simultaneous
+submissions of one cart cannot both get through, and a repeat submission is
+answered from the cache. On a cache miss the database is asked, through the
+``(double_entry_hash, created_at)`` index, so the check costs one index seek
+however many orders exist.
+
+With ``TRUST_CACHE`` (only for a cache shared by every worker, e.g. Redis)
+the cache is primed with the whole window and a miss is final, so checks
+stop touching the database altogether.
+"""
+import hashlib
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils import timezone
+
+from .models import Order
+
+PRIMED_KEY = 'order:dedup:primed'
+
+
+def _settings():
+    return getattr(settings, 'ORDER_DEDUP', {}) or {}
+
+
+def window_seconds() -> int:
+    return int(_settings().get('WINDOW_SECONDS', 60 * 60 * 24))
+
+
+# Simple double-entry detection: hash of name+phone+address+total rounded
+def make_double_hash(name, phone, address, total):
+    key = f"{name}|{phone}|{address}|{round(float(total),2)}"
+    return hashlib.sha256(key.encode()).hexdigest()
+
+
+def _key(double_hash):
+    return f'order:dedup:{double_hash}'
+
+
+def prime() -> int:
+    """Load every hash from the current window into the cache; returns how many."""
+    now = timezone.now()
+    recent = Order.objects.filter(
+        created_at__gte=now - timedelta(seconds=window_seconds()), double_entry_hash__isnull=False,
+    ).values_list('double_entry_hash', 'created_at')
+    count = 0
+    for double_hash, created_at in recent.iterator(chunk_size=2000):
+        remaining = window_seconds() - (now - created_at).total_seconds()
+        if remaining > 0:
+            cache.add(_key(double_hash), 1, int(remaining) + 1)
+            count += 1
+    cache.set(PRIMED_KEY, 1, window_seconds())
+    return count
+
+
+def _in_database(double_hash) -> bool:
+    since = timezone.now() - timedelta(seconds=window_seconds())
+    return Order.objects.filter(double_entry_hash=double_hash, created_at__gte=since).exists()
+
+
+def claim(double_hash) -> bool:
+    """``True`` if no order with this hash is in the window; the hash is then taken.
+
+    Call ``release`` if the order is not placed after all.
+    """
+    if not cache.add(_key(double_hash), 1, window_seconds()):
+        return False
+    if _settings().get('TRUST_CACHE'):
+        if cache.get(PRIMED_KEY):
+            return True
+        # Marker lapsed: prime again and let this one check go to the database
+        prime()
+    if _in_database(double_hash):
+        return False
+    return True
+
+
+def release(double_hash):
+    cache.delete(_key(double_hash))
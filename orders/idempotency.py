@@ -0,0 +1,111 @@
+"""Idempotency keys for checkout and payment callbacks.
+
+A view wrapped in ``idempotent`` runs once per key within
+``ORDER_IDEMPOTENCY["WINDOW_SECONDS"]``; a replay gets the stored response
+back without the view running again. The key comes from the
+``Idempotency-Key`` header, or for plain HTML forms from an
+``idempotency_key`` field, and is scoped to the visitor so one client's key
+never replays another's page. Payment-gateway callbacks instead derive the key
+from the gateway's own transaction ids.
+
+Responses are stored compactly in the cache: status, ``Location`` and content
+type, plus the zlib-compressed body (empty for redirects). Only non-5xx,
+non-streaming responses are kept; a view can call ``skip_replay(response)``
+for results that are worth retrying, such as a failed gateway verification.
+A replay that arrives while the first request is still running gets a 409.
+"""
+import hashlib
+import zlib
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import cache
+from django.http import HttpResponse
+
+IN_FLIGHT = 'in-flight'
+
+
+def _settings():
+    return getattr(settings, 'ORDER_IDEMPOTENCY', {}) or {}
+
+
+def window_seconds() -> int:
+    return int(_settings().get('WINDOW_SECONDS', 60 * 60 * 24))
+
+
+def client_key(request, *args, **kwargs):
+    """The client's ``Idempotency-Key`` header, or the form's ``idempotency_key`` field."""
+    return request.headers.get('Idempotency-Key') or request.POST.get('idempotency_key')
+
+
+def visitor(request):
+    if request.user.is_authenticated:
+        return f'user:{request.user.pk}'
+    if request.session.session_key is None:
+        request.session.save()
+    return f'session:{request.session.session_key}'
+
+
+def skip_replay(response):
+    """Keep ``response`` out of the store so a retry runs the view again."""
+    response._idempotency_skip = True
+    return response
+
+
+def _pack(response):
+    return (
+        response.status_code,
+        response.get('Location', ''),
+        response.get('Content-Type', ''),
+        zlib.compress(response.content) if response.content else b'',
+    )
+
+
+def _unpack(record):
+    status, location, content_type, body = record
+    response = HttpResponse(zlib.decompress(body) if body else b'', status=status, content_type=content_type)
+    if location:
+        response['Location'] = location
+    response['Idempotent-Replayed'] = 'true'
+    return response
+
+
+def idempotent(scope, key_func=client_key, per_visitor=True):
+    """Run the view once per key; requests without a key run as usual."""
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            key = key_func(request, *args, **kwargs)
+            if not key:
+                return view(request, *args, **kwargs)
+            parts = [scope, visitor(request) if per_visitor else '', str(key)]
+            cache_key = 'idem:' + hashlib.sha256('|'.join(parts).encode()).hexdigest()
+
+            if not cache.add(cache_key, IN_FLIGHT, 60):
+                record = cache.get(cache_key)
+                if record == IN_FLIGHT:
+                    return HttpResponse('This request is already being processed.', status=409)
+                if record is not None:
+                    return _unpack(record)
+                # Expired between add() and get(); run as a fresh request
+                cache.add(cache_key, IN_FLIGHT, 60)
+
+            try:
+                response = view(request, *args, **kwargs)
+            except Exception:
+                cache.delete(cache_key)
+                raise
+            if (response.status_code >= 500 or response.streaming
+                    or getattr(response, '_idempotency_skip', False)):
+                cache.delete(cache_key)
+            else:
+                cache.set(cache_key, _pack(response), window_seconds())
+            return response
+        return wrapper
+    return decorator
+
+
+def gateway_key(request, order_id):
+    """Payment callbacks: the gateway's transaction ids for this order."""
+    params = request.GET if request.method == 'GET' else request.POST
+    return f"{order_id}:{params.get('val_id') or params.get('tran_id') or ''}"
@@ -0,0 +1,78 @@
+import threading
+import time
+import uuid
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import OperationalError, connection
+from django.db.models import Sum
+
+from orders.checkout import OutOfStock, place_order
+from orders.models import Order, OrderItem
+from products.models import Product
+
+
+class Command(BaseCommand):
+    help = ('Hammer orders.checkout.place_order from concurrent threads against a scratch product, '
+            'fail if any stock is oversold or any checkout hits a locked database, and report placed '
+            'orders/s (the scratch data is removed afterwards)')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--stock', type=int, default=200, help='Units on the scratch product (default: 200)')
+        parser.add_argument('--workers', type=int, default=8, help='Concurrent checkout threads (default: 8)')
+        parser.add_argument('--attempts', type=int, default=50, help='Checkouts per thread (default: 50)')
+        parser.add_argument('--qty', type=int, default=1, help='Units per checkout (default: 1)')
+
+    def handle(self, *args, **options):
+        tag = uuid.uuid4().hex[:12]
+        product = Product.objects.create(
+            sku=f'stress-{tag}', slug=f'stress-{tag}', name='Checkout stress test',
+            price=Decimal('10.00'), stock=options['stock'], active=True,
+        )
+        results = {'placed': 0, 'sold_out': 0, 'busy': 0}
+        lock = threading.Lock()
+
+        def worker():
+            try:
+                for _ in range(options['attempts']):
+                    try:
+                        place_order({product.sku: options['qty']}, name='stress', phone=tag, address='stress')
+                        outcome = 'placed'
+                    except OutOfStock:
+                        outcome = 'sold_out'
+                    except OperationalError:
+                        # e.g. SQLite "database is locked"; the transaction was rolled back
+                        outcome = 'busy'
+                    with lock:
+                        results[outcome] += 1
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=worker) for _ in range(options['workers'])]
+        started = time.monotonic()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.monotonic() - started
+
+        try:
+            product.refresh_from_db()
+            orders = Order.objects.filter(phone=tag)
+            sold = OrderItem.objects.filter(order__in=orders).aggregate(n=Sum('qty'))['n'] or 0
+            order_count = orders.count()
+        finally:
+            Order.objects.filter(phone=tag).delete()
+            product.delete()
+
+        self.stdout.write(
+            f"{results['placed']} orders, {results['sold_out']} sold out, {results['busy']} busy "
+            f"in {elapsed:.2f}s ({results['placed'] / elapsed:.1f} orders/s)"
+        )
+        if results['busy']:
+            raise CommandError(f"{results['busy']} checkouts failed on a locked database")
+        if order_count != results['placed']:
+            raise CommandError(f'{order_count} orders stored but {results["placed"]} reported placed')
+        if product.stock < 0 or sold + product.stock != options['stock']:
+            raise CommandError(f'Oversold: {sold} units ordered, {product.stock} left of {options["stock"]}')
+        self.stdout.write(self.style.SUCCESS(f'No overselling: {sold} sold, {product.stock} left'))
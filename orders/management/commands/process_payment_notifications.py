@@ -0,0 +1,25 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from orders import payments
+
+
+class Command(BaseCommand):
+    help = 'Validate stored payment gateway notifications and settle their orders'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true', help='Process what is due now, then exit')
+        parser.add_argument('--batch-size', type=int, default=None, help='Notifications per batch')
+        parser.add_argument('--interval', type=float, default=2.0,
+                            help='Seconds to sleep when nothing is due (default: 2)')
+
+    def handle(self, *args, **options):
+        while True:
+            settled, retrying = payments.process(options['batch_size'])
+            if settled or retrying:
+                self.stdout.write(f'Settled {settled}, retrying {retrying}')
+                continue
+            if options['once']:
+                break
+            time.sleep(options['interval'])
@@ -0,0 +1,25 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from orders import outbox
+
+
+class Command(BaseCommand):
+    help = 'Deliver queued transactional email from the EmailOutbox table'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true', help='Drain what is due now, then exit')
+        parser.add_argument('--batch-size', type=int, default=None, help='Messages per SMTP connection')
+        parser.add_argument('--interval', type=float, default=5.0,
+                            help='Seconds to sleep when the queue is empty (default: 5)')
+
+    def handle(self, *args, **options):
+        while True:
+            sent, failed = outbox.deliver(options['batch_size'])
+            if sent or failed:
+                self.stdout.write(f'Sent {sent}, failed {failed}')
+                continue
+            if options['once']:
+                break
+            time.sleep(options['interval'])
@@ -0,0 +1,17 @@
+# Generated by Django 5.2.18 on 2026-10-16 21:30
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0010_remove_pathaoinvoice_order_delete_pathaolocation_and_more'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(fields=['double_entry_hash', 'created_at'], name='order_dedup_idx'),
+        ),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 5.2.18 on 2026-10-16 22:00
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0012_emailoutbox'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PaymentNotification',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('tran_id', models.CharField(max_length=128)),
+                ('val_id', models.CharField(blank=True, default='', max_length=128)),
+                ('gateway_status', models.CharField(blank=True, max_length=32)),
+                ('source', models.CharField(choices=[('ipn', 'IPN'), ('browser', 'Browser return')], default='ipn', max_length=16)),
+                ('payload', models.JSONField(blank=True, null=True)),
+                ('status', models.CharField(choices=[('received', 'Received'), ('validated', 'Validated'), ('rejected', 'Rejected'), ('failed', 'Failed')], default='received', max_length=20)),
+                ('attempts', models.PositiveSmallIntegerField(default=0)),
+                ('next_attempt_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('last_error', models.TextField(blank=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('processed_at', models.DateTimeField(blank=True, null=True)),
+                ('order', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='payment_notifications', to='orders.order')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('tran_id', 'val_id'), name='payment_notification_uniq')],
+                'indexes': [models.Index(condition=models.Q(('status', 'received')), fields=['next_attempt_at', 'id'], name='payment_notification_due_idx')],
+            },
+        ),
+    ]
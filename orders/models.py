@@ -1,4 +1,5 @@
 from django.db import models
+from django.utils import timezone
 from django.conf import settings
 from products.models import Product
 
@@ -59,6 +60,12 @@ class Order(models.Model):
     payment_gateway_response = models.JSONField(blank=True, null=True)
     email = models.EmailField(blank=True, null=True)
 
+    class Meta:
+        indexes = [
+            # duplicate-order check (orders.dedup): one seek per checkout
+            models.Index(fields=['double_entry_hash', 'created_at'], name='order_dedup_idx'),
+        ]
+
     def already_sent_to_courier(self) -> bool:
         return bool(self.pathao_order_id)
 
@@ -95,3 +102,81 @@ class CourierLog(models.Model):
 
     def __str__(self) -> str:
         return f"CourierLog(order={self.order_id}, action={self.action}, at={self.created_at:%Y-%m-%d %H:%M})"
+
+
+class EmailOutbox(models.Model):
+    """Transactional email queued with the change that triggers it.
+
+    Rows are written in the same transaction as their order and delivered by
+    ``manage.py run_outbox`` (see ``orders.outbox``), so checkout never waits
+    on SMTP.
+    """
+
+    STATUS = [
+        ("pending", "Pending"),
+        ("sent", "Sent"),
+        ("failed", "Failed"),
+    ]
+
+    order = models.ForeignKey(Order, on_delete=models.SET_NULL, null=True, blank=True, related_name="emails")
+    to_email = models.EmailField()
+    subject = models.CharField(max_length=255)
+    body = models.TextField()
+    status = models.CharField(max_length=20, choices=STATUS, default="pending")
+    attempts = models.PositiveSmallIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    sent_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            # the worker's queue: due pending messages, oldest first
+            models.Index(fields=["next_attempt_at", "id"], condition=models.Q(status="pending"), name="outbox_due_idx"),
+        ]
+
+    def __str__(self) -> str:
+        return f"{self.subject} -> {self.to_email} ({self.status})"
+
+
+class PaymentNotification(models.Model):
+    """A payment gateway notification (IPN or browser return), stored once per ``(tran_id, val_id)``.
+
+    Validated against the gateway by ``manage.py process_payment_notifications``
+    (see ``orders.payments``), which moves the order's payment status.
+    """
+
+    STATUS = [
+        ("received", "Received"),
+        ("validated", "Validated"),
+        ("rejected", "Rejected"),
+        ("failed", "Failed"),
+    ]
+    SOURCES = [
+        ("ipn", "IPN"),
+        ("browser", "Browser return"),
+    ]
+
+    order = models.ForeignKey(Order, on_delete=models.SET_NULL, null=True, blank=True, related_name="payment_notifications")
+    tran_id = models.CharField(max_length=128)
+    val_id = models.CharField(max_length=128, blank=True, default="")
+    gateway_status = models.CharField(max_length=32, blank=True)
+    source = models.CharField(max_length=16, choices=SOURCES, default="ipn")
+    payload = models.JSONField(blank=True, null=True)
+    status = models.CharField(max_length=20, choices=STATUS, default="received")
+    attempts = models.PositiveSmallIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    processed_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["tran_id", "val_id"], name="payment_notification_uniq"),
+        ]
+        indexes = [
+            models.Index(fields=["next_attempt_at", "id"], condition=models.Q(status="received"), name="payment_notification_due_idx"),
+        ]
+
+    def __str__(self) -> str:
+        return f"{self.tran_id} {self.gateway_status} ({self.status})"
@@ -0,0 +1,88 @@
+"""Transactional email outbox.
+
+``enqueue`` writes an ``EmailOutbox`` row inside the caller's transaction, so
+a message exists exactly when the order that triggered it does. ``deliver``
+drains due messages in batches over one reused mail connection, retrying
+failures with exponential backoff until ``MAX_ATTEMPTS``. Batches are leased
+(``orders.leasing``) rather than locked, so SMTP never runs inside a
+transaction and several workers can share the queue.
+"""
+import logging
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+from django.utils import timezone
+
+from .leasing import lease
+from .models import EmailOutbox
+
+logger = logging.getLogger(__name__)
+
+
+def _settings():
+    return getattr(settings, 'EMAIL_OUTBOX', {}) or {}
+
+
+def enqueue(to_email, subject, body, order=None):
+    return EmailOutbox.objects.create(order=order, to_email=to_email, subject=subject, body=body)
+
+
+def enqueue_order_confirmation(order):
+    if order.email:
+        enqueue(order.email, f'Order Confirmation #{order.id}', f'Thanks for your order. Reference: {order.id}', order)
+
+
+def backoff(attempts) -> timedelta:
+    base = int(_settings().get('RETRY_BASE_SECONDS', 30))
+    return timedelta(seconds=min(base * 2 ** (attempts - 1), 60 * 60 * 6))
+
+
+def _retry_or_fail(message, exc, max_attempts):
+    logger.warning('Outbox message %s failed (attempt %s): %s', message.pk, message.attempts, exc)
+    fields = {'last_error': str(exc)[:2000]}
+    if message.attempts >= max_attempts:
+        fields['status'] = 'failed'
+    else:
+        fields['next_attempt_at'] = timezone.now() + backoff(message.attempts)
+    EmailOutbox.objects.filter(pk=message.pk).update(**fields)
+
+
+def deliver(batch_size=None, connection=None):
+    """Send one batch of due messages; returns ``(sent, failed)``."""
+    batch_size = batch_size or int(_settings().get('BATCH_SIZE', 50))
+    max_attempts = int(_settings().get('MAX_ATTEMPTS', 8))
+    messages = lease(
+        EmailOutbox.objects.filter(status='pending'), batch_size, int(_settings().get('LEASE_SECONDS', 600)),
+    )
+    if not messages:
+        return 0, 0
+    sent = failed = 0
+    connection = connection or get_connection()
+    try:
+        connection.open()
+        open_error = None
+    except Exception as exc:
+        # Server unreachable: count it as a failed attempt for the whole batch
+        open_error = exc
+    try:
+        for message in messages:
+            try:
+                if open_error is not None:
+                    raise open_error
+                EmailMessage(
+                    message.subject, message.body, settings.EMAIL_HOST_USER, [message.to_email],
+                    connection=connection,
+                ).send()
+            except Exception as exc:
+                _retry_or_fail(message, exc, max_attempts)
+                failed += 1
+            else:
+                # Marked one by one, so a crash re-sends at most the message in flight
+                EmailOutbox.objects.filter(pk=message.pk).update(
+                    status='sent', sent_at=timezone.now(), last_error='',
+                )
+                sent += 1
+    finally:
+        connection.close()
+    return sent, failed
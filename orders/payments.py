@@ -0,0 +1,176 @@
+"""Asynchronous settlement of online payments.
+
+Gateway notifications (the SSLCommerz IPN, and the customer's browser return
+as a backup) are stored by ``record`` with ``ignore_conflicts`` on
+``(tran_id, val_id)``, so repeats cost one insert attempt and nothing else.
+``process`` is run by ``manage.py process_payment_notifications``. It
+confirms each new notification with the gateway (the validator API for
+payments, the transaction query API for failed or cancelled attempts) and
+only then moves the order's ``payment_status``, retrying gateway errors with
+backoff. The customer's
+success page only reads the result.
+"""
+import logging
+import re
+from datetime import timedelta
+from decimal import Decimal, InvalidOperation
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from .leasing import lease
+from .models import Order, PaymentNotification
+from .ssl_commerz import SSLCommerzClient
+
+logger = logging.getLogger(__name__)
+
+TRAN_ID_RE = re.compile(r'^ORDER_(\d+)_')
+VALID_STATUSES = {'VALID', 'VALIDATED'}
+CLOSED_STATUSES = {'FAILED': 'failed', 'CANCELLED': 'cancelled', 'EXPIRED': 'failed', 'UNATTEMPTED': 'failed'}
+
+
+def _settings():
+    return getattr(settings, 'PAYMENT_NOTIFICATIONS', {}) or {}
+
+
+def _order_id(params):
+    value = params.get('value_a')
+    if value and str(value).isdigit():
+        return int(value)
+    match = TRAN_ID_RE.match(params.get('tran_id') or '')
+    return int(match.group(1)) if match else None
+
+
+def record(params, source='ipn'):
+    """Store a notification once; returns ``False`` if it carried no ``tran_id``."""
+    tran_id = params.get('tran_id')
+    if not tran_id:
+        return False
+    order_id = _order_id(params)
+    if order_id is not None and not Order.objects.filter(pk=order_id).exists():
+        order_id = None
+    PaymentNotification.objects.bulk_create([PaymentNotification(
+        order_id=order_id,
+        tran_id=tran_id,
+        val_id=params.get('val_id') or '',
+        gateway_status=(params.get('status') or '').upper(),
+        source=source,
+        payload={key: params.get(key) for key in params},
+    )], ignore_conflicts=True)
+    return True
+
+
+def backoff(attempts) -> timedelta:
+    base = int(_settings().get('RETRY_BASE_SECONDS', 15))
+    return timedelta(seconds=min(base * 2 ** (attempts - 1), 60 * 60))
+
+
+def _matches(order, result):
+    """The validator's record must be for this order's transaction and full amount."""
+    try:
+        amount = Decimal(str(result.get('amount')))
+    except (InvalidOperation, TypeError):
+        return False
+    return (
+        result.get('status') in VALID_STATUSES
+        and str(result.get('value_a') or order.pk) == str(order.pk)
+        and amount == order.total
+        and (result.get('currency') or 'BDT') == 'BDT'
+    )
+
+
+def _closed_by_gateway(notification, client):
+    """The transaction belongs to the order and the gateway reports the claimed status and no payment."""
+    match = TRAN_ID_RE.match(notification.tran_id)
+    if not match or int(match.group(1)) != notification.order_id:
+        return False
+    statuses = {(record.get('status') or '').upper() for record in client.query_transaction(notification.tran_id)}
+    return notification.gateway_status in statuses and not statuses & VALID_STATUSES
+
+
+def _verdict(notification, client):
+    """Decide one notification, asking the gateway if needed; runs outside any transaction.
+
+    Returns ``(status, result)``: the notification's new status and, for a paid
+    order, the validator's record. Sets ``last_error`` on rejection.
+    """
+    if notification.order is None:
+        notification.last_error = 'unknown order'
+        return 'rejected', None
+    if notification.gateway_status in CLOSED_STATUSES and not notification.val_id:
+        # Unauthenticated claim (the IPN URL is public): believe it only if the
+        # gateway has this order's transaction on record with that status
+        if _closed_by_gateway(notification, client):
+            return 'validated', None
+        notification.last_error = f'gateway does not confirm {notification.gateway_status!r}'
+        return 'rejected', None
+    if not notification.val_id:
+        notification.last_error = f'no val_id for status {notification.gateway_status!r}'
+        return 'rejected', None
+
+    result = client.validate(notification.val_id, tran_id=notification.tran_id)
+    if result.get('tran_id') != notification.tran_id or not _matches(notification.order, result):
+        notification.last_error = f"validator says {result.get('status')!r} for {result.get('tran_id')!r}"
+        return 'rejected', None
+    return 'validated', result
+
+
+def _apply(notification, status, result):
+    """Record the verdict and move the order's payment status together."""
+    order_id = notification.order_id
+    with transaction.atomic():
+        if status == 'validated' and result is not None:
+            Order.objects.filter(pk=order_id).exclude(payment_status='paid').update(
+                payment_status='paid',
+                payment_transaction_id=notification.tran_id,
+                payment_gateway_response=result,
+            )
+        elif status == 'validated':
+            # Only a still-pending order is closed; a later successful attempt may already have paid it
+            Order.objects.filter(pk=order_id, payment_status='pending').update(
+                payment_status=CLOSED_STATUSES[notification.gateway_status],
+            )
+        PaymentNotification.objects.filter(pk=notification.pk).update(
+            status=status, last_error=notification.last_error, processed_at=timezone.now(),
+        )
+
+
+def _retry_or_fail(notification, exc, max_attempts):
+    """Returns ``True`` if the notification will be retried."""
+    logger.warning('Payment notification %s failed (attempt %s): %s',
+                   notification.pk, notification.attempts, exc)
+    fields = {'last_error': str(exc)[:2000]}
+    retry = notification.attempts < max_attempts
+    if retry:
+        fields['next_attempt_at'] = timezone.now() + backoff(notification.attempts)
+    else:
+        fields.update(status='failed', processed_at=timezone.now())
+    PaymentNotification.objects.filter(pk=notification.pk).update(**fields)
+    return retry
+
+
+def process(batch_size=None):
+    """Validate one batch of due notifications; returns ``(settled, retrying)``.
+
+    The batch is leased (``orders.leasing``), so no lock or transaction is held
+    while the gateway is called; each verdict is then written in its own short
+    transaction.
+    """
+    batch_size = batch_size or int(_settings().get('BATCH_SIZE', 20))
+    max_attempts = int(_settings().get('MAX_ATTEMPTS', 8))
+    notifications = lease(
+        PaymentNotification.objects.filter(status='received').select_related('order'),
+        batch_size, int(_settings().get('LEASE_SECONDS', 900)),
+    )
+    client = SSLCommerzClient()
+    settled = retrying = 0
+    for notification in notifications:
+        try:
+            _apply(notification, *_verdict(notification, client))
+        except Exception as exc:
+            if _retry_or_fail(notification, exc, max_attempts):
+                retrying += 1
+                continue
+        settled += 1
+    return settled, retrying
@@ -1,20 +1,105 @@
-import hashlib
+"""SSL Commerz payment gateway client.
+
+All calls go through one module-level ``requests.Session`` so connections
+(and their TLS handshakes) are pooled and kept alive across requests. Calls
+use separate connect/read timeouts; the validation call is read-only and is
+retried with jittered exponential backoff, while session creation is only
+retried when the connection was never made. Each call logs one structured
+``sslcommerz.call`` record with its timing instead of printing payloads.
+"""
 import json
+import logging
+import random
+import re
+import threading
+import time
+
 import requests
 from django.conf import settings
 from django.urls import reverse
-from urllib.parse import urljoin
+from requests.adapters import HTTPAdapter
+
+logger = logging.getLogger(__name__)
+
+SANDBOX_URL = "https://sandbox.sslcommerz.com"
+LIVE_URL = "https://securepay.sslcommerz.com"
+
+_session = None
+_session_lock = threading.Lock()
+
+
+def _settings():
+    return getattr(settings, "SSLCOMMERZ", {}) or {}
+
+
+def get_session() -> requests.Session:
+    """The shared, pooled session (created on first use)."""
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                session = requests.Session()
+                pool = int(_settings().get("POOL_SIZE", 10))
+                session.mount("https://", HTTPAdapter(pool_connections=2, pool_maxsize=pool))
+                _session = session
+    return _session
 
 
 class SSLCommerzClient:
     """SSL Commerz payment gateway integration."""
     
     def __init__(self):
-        self.store_id = "shopa68e2679c82422"
-        self.store_password = "shopa68e2679c82422@ssl"
-        # Use sandbox for testing
-        self.base_url = "https://sandbox.sslcommerz.com"
-    
+        s = _settings()
+        self.store_id = s.get("STORE_ID", "")
+        self.store_password = s.get("STORE_PASSWORD", "")
+        self.base_url = (s.get("BASE_URL") or (SANDBOX_URL if s.get("SANDBOX", True) else LIVE_URL)).rstrip("/")
+        self.timeout = (float(s.get("CONNECT_TIMEOUT", 3.05)), float(s.get("READ_TIMEOUT", 20)))
+        self.retries = int(s.get("RETRIES", 2))
+        self.backoff = float(s.get("BACKOFF", 0.5))
+
+        if not all([self.store_id, self.store_password]):
+            logger.warning("SSLCOMMERZ store credentials are not configured.")
+
+    def _post(self, op, path, data, idempotent, tran_id=None):
+        return self._request("POST", op, path, data, idempotent, tran_id)
+
+    def _request(self, method, op, path, data, idempotent, tran_id=None):
+        """Call the gateway, retrying per the call's idempotency; logs one timing record."""
+        url = f"{self.base_url}{path}"
+        payload = {"params": data} if method == "GET" else {"data": data}
+        started = time.monotonic()
+        attempt = 0
+        while True:
+            attempt += 1
+            error = None
+            try:
+                response = get_session().request(method, url, timeout=self.timeout, **payload)
+                retryable = idempotent and (response.status_code >= 500 or response.status_code == 429)
+            except requests.ConnectTimeout as exc:
+                # Nothing reached the gateway, so even session creation is safe to repeat
+                error, retryable = exc, True
+            except (requests.ConnectionError, requests.Timeout) as exc:
+                error, retryable = exc, idempotent
+            if not retryable or attempt > self.retries:
+                break
+            time.sleep(self.backoff * 2 ** (attempt - 1) * random.uniform(0.5, 1.5))
+
+        logger.info(
+            "sslcommerz.call",
+            extra={
+                "gateway": "sslcommerz",
+                "op": op,
+                "status": response.status_code if error is None else None,
+                "error": type(error).__name__ if error is not None else None,
+                "attempts": attempt,
+                "elapsed_ms": round((time.monotonic() - started) * 1000, 1),
+                "tran_id": tran_id or data.get("tran_id"),
+            },
+        )
+        if error is not None:
+            raise error
+        return response
+
     def create_payment_session(self, order, request):
         """Create a payment session with SSL Commerz."""
         
@@ -31,6 +116,8 @@ class SSLCommerzClient:
         cancel_url = request.build_absolute_uri(
             reverse('orders:payment_cancel', kwargs={'order_id': order.id})
         )
+        # Server-to-server notification; settles the order even if the customer never returns
+        ipn_url = request.build_absolute_uri(reverse('orders:payment_ipn'))
         
         # Prepare payment data - enhanced for SSL Commerz
         payment_data = {
@@ -42,6 +129,7 @@ class SSLCommerzClient:
             'success_url': success_url,
             'fail_url': fail_url,
             'cancel_url': cancel_url,
+            'ipn_url': ipn_url,
             'emi_option': 0,
             'cus_name': order.name,
             'cus_email': getattr(order, 'email', ''),
@@ -64,24 +152,13 @@ class SSLCommerzClient:
     def initiate_payment(self, payment_data):
         """Initiate payment with SSL Commerz."""
         try:
-            # Debug: Print payment data
-            print(f"SSL Commerz Payment Data: {payment_data}")
-            
             # SSL Commerz uses v3 API endpoint
-            response = requests.post(
-                f"{self.base_url}/gwprocess/v3/api.php",
-                data=payment_data,
-                timeout=30
-            )
-            
-            print(f"SSL Commerz Response Status: {response.status_code}")
-            print(f"SSL Commerz Response Content: {response.text[:500]}...")
+            response = self._post("initiate_payment", "/gwprocess/v3/api.php", payment_data, idempotent=False)
             
             if response.status_code == 200:
                 try:
                     # Parse JSON response
                     json_response = response.json()
-                    print(f"SSL Commerz JSON Response: {json_response}")
                     
                     if json_response.get('status') == 'SUCCESS':
                         redirect_url = json_response.get('redirectGatewayURL')
@@ -105,7 +182,6 @@ class SSLCommerzClient:
                 except json.JSONDecodeError:
                     # If not JSON, check for redirect URL in text
                     if 'redirectGatewayURL' in response.text:
-                        import re
                         url_match = re.search(r'https://[^\s<>"]+', response.text)
                         if url_match:
                             return {
@@ -129,49 +205,36 @@ class SSLCommerzClient:
                 'message': f'Request failed: {str(e)}'
             }
     
-    def verify_payment(self, request):
-        """Verify payment response from SSL Commerz."""
-        try:
-            # Get payment response data
-            val_id = request.GET.get('val_id')
-            amount = request.GET.get('amount')
-            currency = request.GET.get('currency')
-            tran_id = request.GET.get('tran_id')
-            
-            if not all([val_id, amount, currency, tran_id]):
-                return {
-                    'status': 'error',
-                    'message': 'Missing payment parameters'
-                }
-            
-            # Verify payment with SSL Commerz
-            verify_data = {
-                'store_id': self.store_id,
-                'store_passwd': self.store_password,
-                'val_id': val_id,
-                'format': 'json'
-            }
-            
-            response = requests.post(
-                f"{self.base_url}/validator/api/validationserverAPI.php",
-                data=verify_data,
-                timeout=30
-            )
-            
-            if response.status_code == 200:
-                result = response.json()
-                return {
-                    'status': 'success',
-                    'data': result
-                }
-            else:
-                return {
-                    'status': 'error',
-                    'message': f'Verification failed: {response.status_code}'
-                }
-                
-        except Exception as e:
-            return {
-                'status': 'error',
-                'message': f'Verification error: {str(e)}'
-            }
+    def validate(self, val_id, tran_id=None):
+        """The validator API's record for ``val_id``; raises ``requests.RequestException`` on failure."""
+        verify_data = {
+            'store_id': self.store_id,
+            'store_passwd': self.store_password,
+            'val_id': val_id,
+            'format': 'json'
+        }
+        # Validation only reads the transaction, so it is retried
+        response = self._post(
+            "validate", "/validator/api/validationserverAPI.php", verify_data,
+            idempotent=True, tran_id=tran_id,
+        )
+        response.raise_for_status()
+        return response.json()
+
+    def query_transaction(self, tran_id):
+        """The gateway's records of every attempt on ``tran_id`` (transaction query API).
+
+        Raises ``requests.RequestException`` on failure.
+        """
+        params = {
+            'store_id': self.store_id,
+            'store_passwd': self.store_password,
+            'tran_id': tran_id,
+            'format': 'json'
+        }
+        response = self._request(
+            "GET", "query_transaction", "/validator/api/merchantTransIDvalidationAPI.php", params,
+            idempotent=True, tran_id=tran_id,
+        )
+        response.raise_for_status()
+        return response.json().get('element') or []
@@ -0,0 +1,135 @@
+import statistics
+import threading
+import time
+import uuid
+from collections import Counter
+from datetime import timedelta
+from decimal import Decimal
+from unittest import mock
+
+from django.db import OperationalError, connection
+from django.db.models import Sum
+from django.test import TestCase, TransactionTestCase, override_settings, tag
+from django.urls import reverse
+from django.utils import timezone
+
+from products.models import Product, ProductListing
+
+from . import dedup
+from .checkout import OutOfStock, place_order
+from .models import Order, OrderItem
+
+LOCAL_CACHES = {
+    'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'tests-default'},
+    'shared': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'tests-shared'},
+}
+
+
+@override_settings(CACHES=LOCAL_CACHES)
+class ConcurrentCheckoutTests(TransactionTestCase):
+    """Checkouts racing for the same stock from several connections never oversell it."""
+
+    STOCK = 50
+    WORKERS = 4
+    ATTEMPTS = 20
+
+    def test_concurrent_checkouts_never_oversell(self):
+        product = Product.objects.create(
+            sku='STRESS', slug='stress', name='Stress', price=Decimal('10.00'), stock=self.STOCK,
+        )
+        results = Counter()
+        lock = threading.Lock()
+
+        def worker():
+            try:
+                for _ in range(self.ATTEMPTS):
+                    try:
+                        place_order({product.sku: 1}, name='stress', phone='0', address='stress')
+                        outcome = 'placed'
+                    except OutOfStock:
+                        outcome = 'sold_out'
+                    except OperationalError:
+                        outcome = 'busy'
+                    with lock:
+                        results[outcome] += 1
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=worker) for _ in range(self.WORKERS)]
+        started = time.monotonic()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.monotonic() - started
+
+        product.refresh_from_db()
+        sold = OrderItem.objects.filter(product=product).aggregate(n=Sum('qty'))['n'] or 0
+        self.assertEqual(results['busy'], 0, 'checkouts failed on a locked database')
+        self.assertEqual(results['placed'], min(self.STOCK, self.WORKERS * self.ATTEMPTS))
+        self.assertEqual(Order.objects.count(), results['placed'])
+        self.assertEqual(sold + product.stock, self.STOCK)
+        self.assertGreaterEqual(product.stock, 0)
+        self.assertEqual(ProductListing.objects.get(pk=product.pk).stock, product.stock)
+        # Throughput is informational; a regression shows up as a slow test
+        self.assertGreater(results['placed'] / elapsed, 0)
+
+
+@override_settings(CACHES=LOCAL_CACHES)
+class OrderDedupTests(TestCase):
+    def setUp(self):
+        dedup.cache.clear()
+
+    def test_repeat_is_refused_until_released(self):
+        double_hash = uuid.uuid4().hex
+        self.assertTrue(dedup.claim(double_hash))
+        self.assertFalse(dedup.claim(double_hash))
+        dedup.release(double_hash)
+        self.assertTrue(dedup.claim(double_hash))
+
+    def test_stored_order_is_a_duplicate_after_the_cache_is_lost(self):
+        double_hash = uuid.uuid4().hex
+        Order.objects.create(name='a', phone='0', address='a', double_entry_hash=double_hash)
+        self.assertFalse(dedup.claim(double_hash))
+
+    def test_failed_checkout_releases_the_claim(self):
+        product = Product.objects.create(sku='DEDUP', slug='dedup', name='Dedup', price=Decimal('5.00'), stock=3)
+        self.client.post(reverse('cart_add'), {'sku': product.sku, 'qty': 1})
+        form = {'name': 'n', 'phone': '1', 'address': 'a', 'payment_method': 'cod'}
+        with mock.patch('orders.views.place_order', side_effect=RuntimeError('gateway down')):
+            with self.assertRaises(RuntimeError):
+                self.client.post(reverse('orders:create_order'), form)
+        self.assertTrue(dedup.claim(dedup.make_double_hash('n', '1', 'a', Decimal('5.00'))))
+
+    @tag('slow')
+    def test_check_latency_is_flat_up_to_a_million_orders(self):
+        sizes, medians = [1_000, 10_000, 100_000, 1_000_000], []
+        filled = 0
+        for size in sizes:
+            self._fill(size - filled)
+            filled = size
+            medians.append(self._median_check_us(200))
+        plan = Order.objects.filter(
+            double_entry_hash='x', created_at__gte=timezone.now() - timedelta(seconds=dedup.window_seconds()),
+        ).explain()
+        self.assertIn('order_dedup_idx', plan)
+        self.assertLess(medians[-1], medians[0] * 3, f'median check µs by table size: {dict(zip(sizes, medians))}')
+
+    @staticmethod
+    def _fill(count):
+        # created_at is auto_now_add, so every row lands inside the window: the worst case
+        for start in range(0, count, 5000):
+            Order.objects.bulk_create([
+                Order(name='bench', phone='0', address='bench', double_entry_hash=uuid.uuid4().hex)
+                for _ in range(min(5000, count - start))
+            ])
+
+    @staticmethod
+    def _median_check_us(probes):
+        timings = []
+        for _ in range(probes):
+            double_hash = uuid.uuid4().hex
+            started = time.perf_counter()
+            dedup._in_database(double_hash)
+            timings.append((time.perf_counter() - started) * 1e6)
+        return statistics.median(timings)
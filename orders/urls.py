@@ -9,4 +9,5 @@ urlpatterns = [
     path('payment/success/<int:order_id>/', views.payment_success, name='payment_success'),
     path('payment/fail/<int:order_id>/', views.payment_fail, name='payment_fail'),
     path('payment/cancel/<int:order_id>/', views.payment_cancel, name='payment_cancel'),
+    path('payment/ipn/', views.payment_ipn, name='payment_ipn'),
 ]
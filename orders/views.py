@@ -1,10 +1,17 @@
+import logging
+
+from django.contrib import messages
+from django.db import OperationalError
+from django.http import HttpResponse, HttpResponseBadRequest
 from django.shortcuts import render, redirect, get_object_or_404
 from django.views.decorators.http import require_POST
-from .models import Order, OrderItem, CourierLog
-from products.models import Product
-from django.utils import timezone
-import hashlib
-from django.core.mail import send_mail
+from . import dedup
+from . import payments
+from .checkout import OutOfStock, place_order
+from .idempotency import gateway_key, idempotent, skip_replay
+from .models import Order, CourierLog
+from products import reservations
+from products.cart import CartPricer
 from django.conf import settings
 
 # DRF webhook
@@ -14,12 +21,10 @@ from rest_framework import status
 from django.utils.decorators import method_decorator
 from django.views.decorators.csrf import csrf_exempt
 
-# Simple double-entry detection: hash of name+phone+address+total rounded
-def make_double_hash(name, phone, address, total):
-    key = f"{name}|{phone}|{address}|{round(float(total),2)}"
-    return hashlib.sha256(key.encode()).hexdigest()
+logger = logging.getLogger(__name__)
 
 @require_POST
+@idempotent('create_order')
 def create_order(request):
     data = request.POST
     name = data.get('name')
@@ -28,50 +33,70 @@ def create_order(request):
     email = data.get('email')
     payment_method = data.get('payment_method', 'cod')
     
-    cart_items = request.session.get('cart', {})
-    if not cart_items:
+    pricer = CartPricer.for_request(request)
+    if not pricer.quantities:
         return render(request, 'orders/no_cart.html')
     
-    total = 0
-    for sku, qty in cart_items.items():
-        try:
-            p = Product.objects.get(sku=sku)
-            total += float(p.price) * int(qty)
-        except Product.DoesNotExist:
-            continue
+    total = pricer.total
     
-    double_hash = make_double_hash(name, phone, address, total)
-    if Order.objects.filter(double_entry_hash=double_hash, created_at__gte=timezone.now()-timezone.timedelta(hours=24)).exists():
+    double_hash = dedup.make_double_hash(name, phone, address, total)
+    if not dedup.claim(double_hash):
         return render(request, 'orders/duplicate.html')
     
-    # Create order with payment method
-    order = Order.objects.create(
-        name=name, 
-        phone=phone, 
-        address=address, 
-        email=email,
-        total=total, 
-        double_entry_hash=double_hash,
-        payment_method=payment_method,
-        payment_status='pending' if payment_method == 'online' else 'paid'
-    )
-    
-    for sku, qty in cart_items.items():
+    try:
+        # Flash-sale lines must be covered by live holds (taken again if they expired)
         try:
-            p = Product.objects.get(sku=sku)
-            OrderItem.objects.create(order=order, product=p, qty=qty, price=p.price)
-            p.stock = max(0, p.stock - int(qty))
-            p.save()
-        except Product.DoesNotExist:
-            continue
-    
-    # Clear cart
-    request.session['cart'] = {}
+            for sku, qty in pricer.quantities.items():
+                reservations.reserve(request, sku, qty)
+        except reservations.SoldOut as exc:
+            try:
+                pricer.cart.set(exc.sku, exc.available)
+            except reservations.SoldOut:
+                # Someone took the free units meanwhile; keep what this visitor holds
+                pricer.cart.set(exc.sku, reservations.held(request, exc.sku))
+            messages.error(request, f'Only {exc.available} of {exc.sku} are left in the flash sale; '
+                                    'your cart has been updated. Please review it and place the order again.')
+            dedup.release(double_hash)
+            return skip_replay(redirect('cart_view'))
     
-    try:
-        send_mail(f'Order Confirmation #{order.id}', f'Thanks for your order. Reference: {order.id}', settings.EMAIL_HOST_USER, [email])
+        # One transaction: stock is locked, checked and taken together with the order
+        try:
+            order, filled = place_order(
+                pricer.quantities,
+                name=name, 
+                phone=phone, 
+                address=address, 
+                email=email,
+                double_entry_hash=double_hash,
+                payment_method=payment_method,
+                payment_status='pending' if payment_method == 'online' else 'paid'
+            )
+        except OutOfStock as exc:
+            if not exc.shortages:
+                dedup.release(double_hash)
+                return render(request, 'orders/no_cart.html')
+            cart = pricer.cart
+            for sku, left in exc.shortages.items():
+                cart.set(sku, left)
+            messages.error(request, 'Some items sold out while you were shopping; your cart now holds what is left. '
+                                    'Please review it and place the order again.')
+            dedup.release(double_hash)
+            return skip_replay(redirect('cart_view'))
+        except OperationalError:
+            # e.g. the database stayed locked past its timeout; nothing was written
+            logger.warning('Checkout failed on a busy database', exc_info=True)
+            messages.error(request, 'We could not place your order just now. Please try again.')
+            dedup.release(double_hash)
+            return skip_replay(redirect('cart_view'))
     except Exception:
-        pass
+        # Any failure before the order commits must free the hash, or the retry is called a duplicate
+        dedup.release(double_hash)
+        raise
+    
+    reservations.consume(request, filled)
+    
+    # Clear cart
+    pricer.cart.clear()
     
     request.session['last_order_id'] = order.id
     
@@ -122,44 +147,56 @@ def process_payment(request, order_id):
             'error': f'Payment gateway error: {str(e)}'
         })
 
+@csrf_exempt
+@idempotent('payment_success', key_func=gateway_key, per_visitor=False)
 def payment_success(request, order_id):
-    """Handle successful payment."""
+    """Customer's return from the gateway: show the payment state the IPN worker settled.
+
+    The return itself is recorded as a notification too, so the order still
+    gets validated if the gateway's IPN never arrives.
+    """
     order = get_object_or_404(Order, pk=order_id)
+    params = request.POST if request.method == 'POST' else request.GET
+    if order.payment_status != 'paid':
+        payments.record(params, source='browser')
     
-    from .ssl_commerz import SSLCommerzClient
-    ssl_client = SSLCommerzClient()
-    verification_result = ssl_client.verify_payment(request)
-    
-    if verification_result.get('status') == 'success':
-        # Update order payment status
-        order.payment_status = 'paid'
-        order.payment_transaction_id = request.GET.get('tran_id')
-        order.payment_gateway_response = verification_result.get('data')
-        order.save()
-        
+    if order.payment_status == 'paid':
         return render(request, 'orders/payment_success.html', {
             'order': order,
-            'transaction_id': request.GET.get('tran_id')
-        })
-    else:
-        return render(request, 'orders/payment_error.html', {
-            'order': order,
-            'error': 'Payment verification failed'
+            'transaction_id': order.payment_transaction_id or params.get('tran_id')
         })
+    # Not final from the customer's side yet, so none of these may be replayed
+    if order.payment_status in ('failed', 'cancelled'):
+        return skip_replay(render(request, 'orders/payment_fail.html', {'order': order}))
+    return skip_replay(render(request, 'orders/payment_processing.html', {'order': order}))
+
+@csrf_exempt
+@require_POST
+def payment_ipn(request):
+    """SSLCommerz instant payment notification: store it and let the worker validate it."""
+    if not payments.record(request.POST, source='ipn'):
+        return HttpResponseBadRequest('tran_id is required')
+    return HttpResponse('OK')
 
+@idempotent('payment_fail', key_func=gateway_key, per_visitor=False)
 def payment_fail(request, order_id):
     """Handle failed payment."""
     order = get_object_or_404(Order, pk=order_id)
-    order.payment_status = 'failed'
-    order.save()
+    # The IPN worker may already have settled a later, successful attempt
+    if order.payment_status != 'paid':
+        order.payment_status = 'failed'
+        order.save()
     
     return render(request, 'orders/payment_fail.html', {'order': order})
 
+@idempotent('payment_cancel', key_func=gateway_key, per_visitor=False)
 def payment_cancel(request, order_id):
     """Handle cancelled payment."""
     order = get_object_or_404(Order, pk=order_id)
-    order.payment_status = 'cancelled'
-    order.save()
+    # The IPN worker may already have settled a later, successful attempt
+    if order.payment_status != 'paid':
+        order.payment_status = 'cancelled'
+        order.save()
     
     return render(request, 'orders/payment_cancel.html', {'order': order})
 
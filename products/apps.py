@@ -1,3 +1,18 @@
+import os
+import sys
+
 from django.apps import AppConfig
+
+
+def _is_management_command():
+    # `manage.py migrate` and friends must not query the catalog in the background
+    return os.path.basename(sys.argv[0]) == 'manage.py' and sys.argv[1:2] != ['runserver']
+
+
 class ProductsConfig(AppConfig):
     name = 'products'
+    def ready(self):
+        from . import checks, signals  # noqa: F401
+        if not _is_management_command():
+            from . import suggest
+            suggest.start_refresher()
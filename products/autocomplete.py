@@ -0,0 +1,254 @@
+"""Popularity-weighted prefix autocomplete backed by a memory-mapped file.
+
+``build_autocomplete`` (management command) precomputes, for every prefix of
+every word-suffix of a product or category name, the top completions ranked by
+popularity, and writes them as a sorted fixed-width table. Each gunicorn
+worker maps the same file read-only and answers a keystroke with one binary
+search, so latency does not grow with the catalog. Rebuilds are written to a
+temp file and swapped in with ``os.replace``; readers notice the new inode on
+their next reload check.
+
+File layout (little-endian)::
+
+    header      magic, version, top_k, label count, key count
+    offsets     (labels + 1) x u32 byte offsets into the label blob
+    records     keys x (key offset u32, key length u16, count u8, pad, top_k x label id u32)
+    blobs       utf-8 labels, then utf-8 keys (sorted by their bytes)
+"""
+import heapq
+import mmap
+import os
+import struct
+import threading
+import time
+from collections import defaultdict
+from typing import Dict, List, Optional
+
+from django.conf import settings
+from django.db.models import Count, Sum
+
+from .models import Category, ProductListing
+from .search import tokenize
+
+MAGIC = b'SAAC'
+VERSION = 1
+TOP_K = 8
+MAX_PREFIX = 24
+# Past queries must be this common (and have found something) to be offered
+MIN_QUERY_SEARCHES = 3
+HEADER = struct.Struct('<4sHHII')
+OFFSET = struct.Struct('<I')
+RECORD = struct.Struct('<IHBx%dI' % TOP_K)
+
+
+def normalize(text: str) -> str:
+    return ' '.join(tokenize(text))
+
+
+def _settings():
+    return getattr(settings, 'PRODUCT_SEARCH', {}) or {}
+
+
+def default_path() -> str:
+    return str(_settings().get('AUTOCOMPLETE_PATH') or os.path.join(settings.BASE_DIR, 'var', 'autocomplete.idx'))
+
+
+# ---- Build ----
+
+def product_popularity() -> Dict[int, float]:
+    """Popularity score per product id: units sold, product views and search clicks."""
+    from analytics.models import AnalyticsEvent
+    from orders.models import OrderItem
+
+    weights: Dict[int, float] = defaultdict(float)
+    for row in OrderItem.objects.exclude(product=None).values('product_id').annotate(units=Sum('qty')):
+        weights[row['product_id']] += 3.0 * (row['units'] or 0)
+    events = AnalyticsEvent.objects.filter(
+        event_type__in=['product_view', 'search'], product_id__isnull=False,
+    ).values('product_id', 'event_type').annotate(n=Count('id'))
+    for row in events:
+        if str(row['product_id']).isdigit():
+            weights[int(row['product_id'])] += (2.0 if row['event_type'] == 'search' else 1.0) * row['n']
+    return weights
+
+
+def query_entries():
+    """(query, weight) pairs for popular past searches that found products.
+
+    Clicks count double, so queries shoppers act on outrank ones they refine.
+    """
+    from analytics.models import SearchQueryStats
+
+    stats = SearchQueryStats.objects.filter(
+        searches__gte=MIN_QUERY_SEARCHES, last_result_count__gt=0,
+    ).values_list('query', 'searches', 'zero_results', 'clicks')
+    for query, searches, zero_results, clicks in stats.iterator(chunk_size=2000):
+        yield query, float(searches - zero_results) + 2.0 * clicks
+
+
+def collect_entries():
+    """(label, weight) pairs for active product names, category names and popular searches."""
+    popularity = product_popularity()
+    entries: Dict[str, float] = {}
+    category_weight: Dict[Optional[int], float] = defaultdict(float)
+    products = ProductListing.objects.values_list('pk', 'name', 'category_id')
+    for pk, name, category_id in products.iterator(chunk_size=2000):
+        weight = popularity.get(pk, 0.0)
+        entries[name] = max(entries.get(name, 0.0), weight)
+        category_weight[category_id] += weight
+    for pk, name in Category.objects.values_list('pk', 'name'):
+        entries[name] = max(entries.get(name, 0.0), category_weight.get(pk, 0.0))
+    # A query that normalizes to an existing label only lends it weight
+    labels = {normalize(label): label for label in entries}
+    for query, weight in query_entries():
+        label = labels.get(query, query)
+        entries[label] = max(entries.get(label, 0.0), weight)
+    return entries.items()
+
+
+def build(entries) -> bytes:
+    labels: List[str] = []
+    top: Dict[str, list] = defaultdict(list)
+    for label, weight in entries:
+        words = normalize(label).split()
+        if not words:
+            continue
+        label_id = len(labels)
+        labels.append(label)
+        # Ties go to shorter labels, then to insertion order
+        rank = (weight, -len(label), -label_id)
+        prefixes = set()
+        for start in range(len(words)):
+            phrase = ' '.join(words[start:])[:MAX_PREFIX]
+            prefixes.update(phrase[:n] for n in range(1, len(phrase) + 1))
+        for prefix in prefixes:
+            heap = top[prefix]
+            if len(heap) < TOP_K:
+                heapq.heappush(heap, (rank, label_id))
+            elif (rank, label_id) > heap[0]:
+                heapq.heapreplace(heap, (rank, label_id))
+
+    label_blob = bytearray()
+    offsets = []
+    for label in labels:
+        offsets.append(len(label_blob))
+        label_blob += label.encode('utf-8')
+    offsets.append(len(label_blob))
+
+    keys = sorted((prefix.encode('utf-8'), prefix) for prefix in top)
+    key_blob = bytearray()
+    records = bytearray()
+    key_base = len(label_blob)
+    for encoded, prefix in keys:
+        completions = [label_id for _, label_id in sorted(top[prefix], reverse=True)]
+        records += RECORD.pack(
+            key_base + len(key_blob), len(encoded), len(completions),
+            *(completions + [0] * (TOP_K - len(completions))),
+        )
+        key_blob += encoded
+
+    out = bytearray(HEADER.pack(MAGIC, VERSION, TOP_K, len(labels), len(keys)))
+    for offset in offsets:
+        out += OFFSET.pack(offset)
+    out += records
+    out += label_blob
+    out += key_blob
+    return bytes(out)
+
+
+def write_index(path: str = None, entries=None) -> int:
+    """Build the index and atomically replace ``path``. Returns the number of labels."""
+    path = path or default_path()
+    entries = list(collect_entries() if entries is None else entries)
+    data = build(entries)
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    tmp = f'{path}.tmp-{os.getpid()}'
+    with open(tmp, 'wb') as fh:
+        fh.write(data)
+        fh.flush()
+        os.fsync(fh.fileno())
+    os.replace(tmp, path)
+    return HEADER.unpack_from(data)[3]
+
+
+# ---- Read ----
+
+class AutocompleteIndex:
+    """Read-only view over an index file; safe to share between threads."""
+
+    def __init__(self, path: str):
+        with open(path, 'rb') as fh:
+            self.stat = os.fstat(fh.fileno())
+            self._map = mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, top_k, self.label_count, self.key_count = HEADER.unpack_from(self._map)
+        if magic != MAGIC or version != VERSION or top_k != TOP_K:
+            raise ValueError(f'{path} is not a version {VERSION} autocomplete index')
+        self._offsets_at = HEADER.size
+        self._records_at = self._offsets_at + OFFSET.size * (self.label_count + 1)
+        self._blob_at = self._records_at + RECORD.size * self.key_count
+
+    def _label(self, label_id: int) -> str:
+        start, end = struct.unpack_from('<II', self._map, self._offsets_at + OFFSET.size * label_id)
+        return self._map[self._blob_at + start:self._blob_at + end].decode('utf-8')
+
+    def _record(self, i: int):
+        return RECORD.unpack_from(self._map, self._records_at + RECORD.size * i)
+
+    def _key(self, record) -> bytes:
+        start = self._blob_at + record[0]
+        return self._map[start:start + record[1]]
+
+    def lookup(self, query: str, limit: int = TOP_K) -> List[str]:
+        normalized = normalize(query)
+        if not normalized:
+            return []
+        target = normalized[:MAX_PREFIX].encode('utf-8')
+        lo, hi = 0, self.key_count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self._key(self._record(mid)) < target:
+                lo = mid + 1
+            else:
+                hi = mid
+        if lo == self.key_count:
+            return []
+        record = self._record(lo)
+        if self._key(record) != target:
+            return []
+        labels = [self._label(label_id) for label_id in record[3:3 + record[2]]]
+        if len(normalized) > MAX_PREFIX:
+            # The table stops at MAX_PREFIX characters; check the rest of the query here
+            labels = [l for l in labels if (' ' + normalize(l)).find(' ' + normalized) != -1]
+        return labels[:limit]
+
+
+_reader: Optional[AutocompleteIndex] = None
+_checked_at = 0.0
+_lock = threading.Lock()
+
+
+def get_reader() -> Optional[AutocompleteIndex]:
+    """Current index for this process, reopened when the file on disk is swapped."""
+    global _reader, _checked_at
+    interval = float(_settings().get('AUTOCOMPLETE_RELOAD', 30))
+    if _reader is not None and time.monotonic() - _checked_at < interval:
+        return _reader
+    with _lock:
+        _checked_at = time.monotonic()
+        path = default_path()
+        try:
+            st = os.stat(path)
+        except OSError:
+            _reader = None
+            return None
+        if _reader is None or (st.st_ino, st.st_mtime_ns) != (_reader.stat.st_ino, _reader.stat.st_mtime_ns):
+            try:
+                _reader = AutocompleteIndex(path)
+            except (OSError, ValueError):
+                _reader = None
+    return _reader
+
+
+def complete(query: str, limit: int = TOP_K) -> List[str]:
+    reader = get_reader()
+    return reader.lookup(query, limit) if reader is not None else []
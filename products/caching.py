@@ -0,0 +1,67 @@
+"""Catalog-wide cache versioning.
+
+Cached catalog data (facet counts, homepage sections, search results) is keyed
+by a generation counter that ``products.signals`` bumps whenever a product or
+category changes, so stale entries are simply never read again and expire on
+their own.
+
+The counter itself lives in the ``shared`` cache alias rather than the
+per-process default, so a bump in one worker reaches every other worker (and
+the ETags built from it).
+"""
+import time
+
+from django.core.cache import cache, caches
+
+from .models import Category, HeroSlide, ProductListing
+
+CATALOG_VERSION_KEY = 'catalog:version'
+HOME_CACHE_TIMEOUT = 60 * 60
+SECTION_SIZE = 8
+
+
+def _version_cache():
+    return caches['shared']
+
+
+def catalog_version() -> int:
+    shared = _version_cache()
+    version = shared.get(CATALOG_VERSION_KEY)
+    if version is None:
+        # Seed from the clock so a flushed cache never reuses an old generation
+        shared.add(CATALOG_VERSION_KEY, time.time_ns(), None)
+        version = shared.get(CATALOG_VERSION_KEY, 0)
+    return version
+
+
+def bump_catalog_version() -> int:
+    shared = _version_cache()
+    try:
+        return shared.incr(CATALOG_VERSION_KEY)
+    except ValueError:
+        shared.add(CATALOG_VERSION_KEY, time.time_ns(), None)
+        return shared.get(CATALOG_VERSION_KEY, 0)
+
+
+def build_home_sections():
+    """Evaluate every filter-independent homepage query."""
+    active = ProductListing.objects.order_by('pk')
+    return {
+        'products': list(active[:50]),
+        'latest_products': list(active.filter(is_latest=True)[:SECTION_SIZE]),
+        'super_sale': list(active.filter(is_super_sale=True)[:SECTION_SIZE]),
+        'flash_sale': list(active.filter(is_flash_sale=True)[:SECTION_SIZE]),
+        'mega_sale': list(active.filter(is_mega_sale=True)[:SECTION_SIZE]),
+        'slides': list(HeroSlide.objects.filter(is_active=True)),
+        'categories': list(Category.objects.all()[:12]),  # Limit to 12 categories for the grid
+    }
+
+
+def home_sections(refresh=False):
+    """Homepage sections for the current catalog generation, built on a miss."""
+    key = f'catalog:home:{catalog_version()}'
+    sections = None if refresh else cache.get(key)
+    if sections is None:
+        sections = build_home_sections()
+        cache.set(key, sections, HOME_CACHE_TIMEOUT)
+    return sections
@@ -1,18 +1,343 @@
-# session-based cart helper
-class Cart:
+import json
+from collections import namedtuple
+from decimal import Decimal
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+from django.utils.functional import cached_property
+
+from . import reservations
+from .models import Product, StoredCart, StoredCartLine
+
+CART_SCHEMA_VERSION = 2
+
+CartLine = namedtuple('CartLine', 'product qty subtotal')
+
+
+def quantity(value) -> int:
+    """Version 1 carts stored ``sku -> qty``; some sessions hold ``{'qty': n}`` dicts or junk."""
+    if isinstance(value, dict):
+        value = value.get('qty', 0)
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return 1
+
+
+def empty_cart() -> dict:
+    return {'v': CART_SCHEMA_VERSION, 'items': {}, 'count': 0, 'total': None}
+
+
+def migrate(data):
+    """Return ``data`` in the current schema; current carts are returned as-is."""
+    if isinstance(data, dict) and data.get('v') == CART_SCHEMA_VERSION:
+        return data
+    cart = empty_cart()
+    if isinstance(data, dict):
+        for sku, value in data.items():
+            qty = quantity(value)
+            if qty > 0:
+                cart['items'][str(sku)] = qty
+        cart['count'] = sum(cart['items'].values())
+    return cart
+
+
+class SessionCartStore:
+    """Keeps the whole cart in ``request.session['cart']`` (the default store)."""
+
     def __init__(self, request):
         self.session = request.session
-        cart = self.session.get('cart')
-        if not cart:
-            cart = self.session['cart'] = {}
-        self.cart = cart
-    def add(self, sku, qty=1):
-        self.cart[sku] = self.cart.get(sku, 0) + int(qty)
+        stored = self.session.get('cart')
+        self.data = migrate(stored)
+        if stored is not None and self.data is not stored:
+            self._save()
+
+    def _save(self):
+        self.session['cart'] = self.data
         self.session.modified = True
+
+    @property
+    def items(self):
+        return self.data['items']
+
+    @property
+    def count(self) -> int:
+        return self.data['count']
+
+    @property
+    def total(self):
+        return self.data['total']
+
+    def fingerprint(self) -> str:
+        return json.dumps(self.data, sort_keys=True)
+
+    def write_line(self, sku, qty):
+        self.data['count'] += qty - self.items.get(sku, 0)
+        if qty:
+            self.items[sku] = qty
+        else:
+            self.items.pop(sku, None)
+        self.data['total'] = None
+        self._save()
+
+    def write_total(self, total):
+        self.data['total'] = total
+        self._save()
+
+    def clear(self):
+        self.data = empty_cart()
+        self._save()
+
+
+class DatabaseCartStore:
+    """Keeps carts in ``StoredCart``/``StoredCartLine``; the session only holds ``cart_id``.
+
+    Each change is a single-row upsert or delete plus an update of the cart's
+    summary columns. A session cart left from the session store is moved in on
+    first use. Nothing is written until the visitor adds something.
+    """
+
+    def __init__(self, request):
+        self.request = request
+        self.session = request.session
+        self.user = request.user if request.user.is_authenticated else None
+        legacy = migrate(self.session.pop('cart', None))
+        for sku, qty in legacy['items'].items():
+            self.write_line(sku, self.items.get(sku, 0) + qty)
+
+    @cached_property
+    def cart(self):
+        if self.user is not None:
+            return StoredCart.objects.filter(user=self.user).first()
+        cart_id = self.session.get('cart_id')
+        if cart_id is None:
+            return None
+        return StoredCart.objects.filter(pk=cart_id, user__isnull=True).first()
+
+    def _cart_for_write(self):
+        if self.cart is None:
+            self.cart = StoredCart.objects.create(user=self.user)
+            if self.user is None:
+                self.session['cart_id'] = self.cart.pk
+        return self.cart
+
+    @cached_property
+    def items(self):
+        if self.cart is None:
+            return {}
+        return dict(self.cart.lines.values_list('sku', 'qty'))
+
+    @property
+    def count(self) -> int:
+        return self.cart.count if self.cart is not None else 0
+
+    @property
+    def total(self):
+        if self.cart is None or self.cart.total is None:
+            return None
+        return str(self.cart.total)
+
+    def fingerprint(self) -> str:
+        if self.cart is None:
+            return ''
+        return f'{self.cart.pk}:{self.cart.updated_at.timestamp()}'
+
+    def write_line(self, sku, qty):
+        cart = self._cart_for_write()
+        delta = qty - self.items.get(sku, 0)
+        if qty:
+            StoredCartLine.objects.bulk_create(
+                [StoredCartLine(cart=cart, sku=sku, qty=qty)],
+                update_conflicts=True, unique_fields=['cart', 'sku'], update_fields=['qty', 'updated_at'],
+            )
+            self.items[sku] = qty
+        else:
+            StoredCartLine.objects.filter(cart=cart, sku=sku).delete()
+            self.items.pop(sku, None)
+        cart.count += delta
+        cart.total = None
+        cart.updated_at = timezone.now()
+        StoredCart.objects.filter(pk=cart.pk).update(
+            count=F('count') + delta, total=None, updated_at=cart.updated_at,
+        )
+
+    def write_total(self, total):
+        if self.cart is not None:
+            self.cart.total = Decimal(total)
+            StoredCart.objects.filter(pk=self.cart.pk).update(total=self.cart.total)
+
+    def clear(self):
+        if self.cart is not None:
+            self.cart.delete()
+        self.cart = None
+        self.items = {}
+        self.session.pop('cart_id', None)
+
+
+CART_STORES = {
+    'session': SessionCartStore,
+    'database': DatabaseCartStore,
+}
+
+
+def get_cart_store(request):
+    """The configured store for this request, created once and shared by every ``Cart``."""
+    store = getattr(request, '_cart_store', None)
+    if store is None:
+        store = request._cart_store = CART_STORES[getattr(settings, 'CART_STORE', 'session')](request)
+    return store
+
+
+def merge_carts(request, user):
+    """Fold the anonymous database cart into ``user``'s cart; quantities add up."""
+    cart_id = request.session.pop('cart_id', None)
+    anonymous = StoredCart.objects.filter(pk=cart_id, user__isnull=True).first() if cart_id else None
+    if anonymous is None:
+        return
+    owned = StoredCart.objects.filter(user=user).first()
+    if owned is None:
+        anonymous.user = user
+        anonymous.save(update_fields=['user', 'updated_at'])
+        return
+    with transaction.atomic():
+        merged = dict(owned.lines.values_list('sku', 'qty'))
+        for sku, qty in anonymous.lines.values_list('sku', 'qty'):
+            merged[sku] = merged.get(sku, 0) + qty
+        StoredCartLine.objects.bulk_create(
+            [StoredCartLine(cart=owned, sku=sku, qty=qty) for sku, qty in merged.items()],
+            update_conflicts=True, unique_fields=['cart', 'sku'], update_fields=['qty', 'updated_at'],
+        )
+        StoredCart.objects.filter(pk=owned.pk).update(
+            count=sum(merged.values()), total=None, updated_at=timezone.now(),
+        )
+        anonymous.delete()
+    request.__dict__.pop('_cart_store', None)
+
+
+class Cart:
+    """The visitor's cart: ``sku -> qty`` lines plus a ``count`` and last priced ``total``.
+
+    Storage is delegated to the store named by ``settings.CART_STORE``. ``count``
+    is kept exact on every change; ``total`` is cleared on change and filled in
+    again by ``CartPricer`` the next time the cart is priced.
+    """
+
+    def __init__(self, request):
+        self.request = request
+        self.store = get_cart_store(request)
+
+    @property
+    def items(self):
+        return self.store.items
+
+    @property
+    def count(self) -> int:
+        return self.store.count
+
+    @property
+    def total(self):
+        """Last priced total, or ``None`` if the cart changed since."""
+        total = self.store.total
+        return Decimal(total) if total is not None else None
+
+    def fingerprint(self) -> str:
+        """Changes whenever the cart does; used in page ETags."""
+        return self.store.fingerprint()
+
+    def set(self, sku, qty):
+        qty = int(qty)
+        if qty <= 0:
+            return self.remove(sku)
+        if self.items.get(sku) != qty:
+            # Flash-sale products need a hold first; raises reservations.SoldOut
+            reservations.reserve(self.request, sku, qty)
+            self.store.write_line(sku, qty)
+
+    def add(self, sku, qty=1):
+        self.set(sku, self.items.get(sku, 0) + int(qty))
+
+    def set_many(self, quantities):
+        """Set several lines, all or none.
+
+        Holds for every flash-sale line that grows are taken before any line is
+        written; if one is sold out, those already taken are given back and
+        ``reservations.SoldOut`` propagates with the cart untouched.
+        """
+        previous = {}
+        try:
+            for sku, qty in quantities.items():
+                if qty > self.items.get(sku, 0):
+                    previous[sku] = reservations.held(self.request, sku)
+                    reservations.reserve(self.request, sku, qty)
+        except reservations.SoldOut:
+            for sku, qty in previous.items():
+                reservations.reserve(self.request, sku, qty)
+            raise
+        for sku, qty in quantities.items():
+            self.set(sku, qty)
+
     def remove(self, sku):
-        if sku in self.cart:
-            del self.cart[sku]
-            self.session.modified = True
+        if sku in self.items:
+            reservations.reserve(self.request, sku, 0)
+            self.store.write_line(sku, 0)
+
+    def set_total(self, total):
+        if self.store.total != str(total):
+            self.store.write_total(str(total))
+
     def clear(self):
-        self.session['cart'] = {}
-        self.session.modified = True
+        reservations.release_all(self.request)
+        self.store.clear()
+
+
+class CartPricer:
+    """Prices a ``sku -> qty`` cart with a single product query.
+
+    Lines keep the cart's order; SKUs that no longer exist are dropped. Use
+    ``for_request`` so the cart page, checkout and the context processor share
+    one lookup per request; its total is also stored as the cart's summary.
+    """
+
+    def __init__(self, items, cart=None):
+        self.quantities = dict(items)
+        self.cart = cart
+
+    @classmethod
+    def for_request(cls, request):
+        cart = Cart(request)
+        key = tuple(cart.items.items())
+        pricer = getattr(request, '_cart_pricer', None)
+        # A cart changed mid-request (add, remove, clear) gets priced afresh
+        if pricer is None or pricer.key != key:
+            pricer = cls(cart.items, cart)
+            pricer.key = key
+            request._cart_pricer = pricer
+        return pricer
+
+    @cached_property
+    def products(self):
+        if not self.quantities:
+            return {}
+        return Product.objects.in_bulk(list(self.quantities), field_name='sku')
+
+    @cached_property
+    def lines(self):
+        lines = []
+        for sku, qty in self.quantities.items():
+            product = self.products.get(sku)
+            if product is not None and qty > 0:
+                lines.append(CartLine(product, qty, product.price * qty))
+        return lines
+
+    @property
+    def count(self) -> int:
+        return sum(self.quantities.values())
+
+    @cached_property
+    def total(self) -> Decimal:
+        total = sum((line.subtotal for line in self.lines), Decimal('0'))
+        if self.cart is not None:
+            self.cart.set_total(total)
+        return total
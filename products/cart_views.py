@@ -1,34 +1,48 @@
+import json
+import uuid
+
+from django.contrib import messages
+from django.http import JsonResponse
 from django.shortcuts import redirect, render
-from .cart import Cart
-from products.models import Product
+from django.template.loader import render_to_string
+from django.views.decorators.http import require_GET, require_POST
+
+from .cart import Cart, CartPricer
+from .models import Product
+from .reservations import SoldOut
+
+def _sold_out(request, exc):
+    messages.error(request, f'Sorry, only {exc.available} left of {exc.sku} in the flash sale.')
 
 def add_to_cart(request):
     if request.method == 'POST':
         sku = request.POST.get('sku')
         qty = int(request.POST.get('qty',1))
         cart = Cart(request)
-        cart.add(sku, qty)
+        try:
+            cart.add(sku, qty)
+        except SoldOut as exc:
+            _sold_out(request, exc)
     next_url = request.POST.get('next') or request.GET.get('next') or '/'
     return redirect(next_url)
 
 def view_cart(request):
-    cart = request.session.get('cart', {})
-    items = []
-    total = 0
-    for sku, qty in cart.items():
-        try:
-            p = Product.objects.get(sku=sku)
-            items.append({'product':p,'qty':qty,'subtotal': float(p.price)*int(qty)})
-            total += float(p.price)*int(qty)
-        except Product.DoesNotExist:
-            continue
-    return render(request, 'products/cart.html', {'items': items, 'total': total})
+    pricer = CartPricer.for_request(request)
+    return render(request, 'products/cart.html', {
+        'items': pricer.lines,
+        'total': pricer.total,
+        # Sent back with the checkout form so a resubmitted order replays instead of running twice
+        'idempotency_key': uuid.uuid4().hex,
+    })
 
 def buy_now(request):
     if request.method == 'POST':
         sku = request.POST.get('sku')
         cart = Cart(request)
-        cart.add(sku, 1)
+        try:
+            cart.add(sku, 1)
+        except SoldOut as exc:
+            _sold_out(request, exc)
     return redirect('cart_view')
 
 def remove_from_cart(request):
@@ -44,10 +58,118 @@ def update_cart(request):
         sku = request.POST.get('sku')
         qty = int(request.POST.get('qty', 1))
         cart = Cart(request)
-        if qty > 0:
-            cart.cart[sku] = qty
-            cart.session.modified = True
-        else:
-            cart.remove(sku)
+        try:
+            cart.set(sku, qty)
+        except SoldOut as exc:
+            _sold_out(request, exc)
     next_url = request.POST.get('next') or request.GET.get('next') or 'cart_view'
     return redirect(next_url)
+
+
+# JSON cart API used by static/js/cart.js; the form views above stay as the no-JS fallback
+
+class CartChangeError(ValueError):
+    pass
+
+
+def _parse_change(op, sku, qty):
+    if op not in ('add', 'set', 'remove'):
+        raise CartChangeError(f'unknown op {op!r}')
+    if not sku:
+        raise CartChangeError('sku is required')
+    if op == 'remove':
+        return op, str(sku), 0
+    try:
+        qty = int(qty)
+    except (TypeError, ValueError):
+        raise CartChangeError(f'bad qty for {sku}')
+    return op, str(sku), qty
+
+
+def _apply(request, changes):
+    """Validate every change, check the SKUs in one query, then apply them all or none."""
+    wanted = {sku for op, sku, qty in changes if op != 'remove'}
+    if wanted:
+        known = set(Product.objects.filter(sku__in=wanted).values_list('sku', flat=True))
+        unknown = sorted(wanted - known)
+        if unknown:
+            raise CartChangeError(f"unknown sku: {', '.join(unknown)}")
+    cart = Cart(request)
+    quantities = dict(cart.items)
+    for op, sku, qty in changes:
+        if op == 'add':
+            quantities[sku] = quantities.get(sku, 0) + qty
+        elif op == 'set':
+            quantities[sku] = qty
+        else:
+            quantities[sku] = 0
+    # Only the net effect is written, after every flash-sale hold it needs is taken
+    cart.set_many({
+        sku: max(qty, 0) for sku, qty in quantities.items() if qty != cart.items.get(sku, 0)
+    })
+
+
+def _summary(request):
+    """New cart summary; ``?fragment=1`` adds the re-rendered cart page lines."""
+    cart = Cart(request)
+    pricer = CartPricer.for_request(request)
+    data = {
+        'count': cart.count,
+        'total': str(pricer.total),
+        'lines': [
+            {'sku': line.product.sku, 'qty': line.qty, 'price': str(line.product.price), 'subtotal': str(line.subtotal)}
+            for line in pricer.lines
+        ],
+    }
+    if request.GET.get('fragment'):
+        context = {'items': pricer.lines}
+        data['html'] = {
+            'rows': render_to_string('products/cart_rows.html', context, request=request),
+            'cards': render_to_string('products/cart_cards.html', context, request=request),
+        }
+    return data
+
+
+def _respond(request, changes):
+    try:
+        _apply(request, [_parse_change(*change) for change in changes])
+    except CartChangeError as exc:
+        return JsonResponse({'error': str(exc)}, status=400)
+    except SoldOut as exc:
+        # Nothing was applied; the summary is the unchanged cart
+        return JsonResponse({'error': str(exc), 'sku': exc.sku, 'available': exc.available, **_summary(request)},
+                            status=409)
+    return JsonResponse(_summary(request))
+
+
+@require_GET
+def cart_api(request):
+    return JsonResponse(_summary(request))
+
+
+@require_POST
+def cart_api_add(request):
+    return _respond(request, [('add', request.POST.get('sku'), request.POST.get('qty', 1))])
+
+
+@require_POST
+def cart_api_update(request):
+    return _respond(request, [('set', request.POST.get('sku'), request.POST.get('qty', 1))])
+
+
+@require_POST
+def cart_api_remove(request):
+    return _respond(request, [('remove', request.POST.get('sku'), None)])
+
+
+@require_POST
+def cart_api_batch(request):
+    """Apply ``{"changes": [{"op": "add"|"set"|"remove", "sku": ..., "qty": ...}, ...]}`` at once."""
+    try:
+        changes = json.loads(request.body or b'{}').get('changes')
+        if not isinstance(changes, list):
+            raise ValueError
+        changes = [(c.get('op', 'set'), c.get('sku'), c.get('qty')) for c in changes]
+    except (ValueError, AttributeError):
+        return JsonResponse({'error': 'expected {"changes": [...]}'}, status=400)
+    return _respond(request, changes)
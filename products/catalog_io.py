@@ -0,0 +1,237 @@
+"""Bulk catalog import/export (``manage.py catalog_import`` / ``catalog_export``).
+
+Rows are streamed from CSV or JSON Lines and applied in batches: one query
+loads the batch's existing products by SKU, then new products go through
+``bulk_create`` and changed ones through ``bulk_update``. Only the columns
+present in the file are written, so a price/stock feed leaves names and
+descriptions alone. Model signals do not fire for bulk writes, so each batch
+re-syncs listings and the search index itself and the catalog version is bumped
+once at the end.
+"""
+import csv
+import json
+import sys
+from decimal import Decimal, InvalidOperation
+
+from django.db import transaction
+from django.utils import timezone
+from django.utils.text import slugify
+
+from . import listings
+from .caching import bump_catalog_version
+from .models import Category, Product
+from .search import get_search_backend
+
+BATCH_SIZE = 1000
+EXPORT_CHUNK_SIZE = 2000
+FORMATS = ('csv', 'jsonl')
+PRODUCT_FIELDS = [
+    'sku', 'name', 'slug', 'description', 'price', 'stock', 'image',
+    'is_latest', 'is_super_sale', 'is_flash_sale', 'is_mega_sale', 'active',
+]
+BOOLEAN_FIELDS = {'is_latest', 'is_super_sale', 'is_flash_sale', 'is_mega_sale', 'active'}
+COLUMNS = PRODUCT_FIELDS + ['category_slug', 'category_name']
+
+
+class RowError(ValueError):
+    pass
+
+
+def detect_format(path, fmt=None):
+    if fmt:
+        return fmt
+    return 'jsonl' if str(path).endswith(('.jsonl', '.ndjson')) else 'csv'
+
+
+def _open(path, mode):
+    if path == '-':
+        return sys.stdin if 'r' in mode else sys.stdout
+    return open(path, mode, newline='', encoding='utf-8')
+
+
+def read_rows(path, fmt):
+    """Yield ``(line number, dict)`` for every record in the file."""
+    fh = _open(path, 'r')
+    try:
+        if fmt == 'jsonl':
+            for number, line in enumerate(fh, start=1):
+                if line.strip():
+                    try:
+                        yield number, json.loads(line)
+                    except ValueError as exc:
+                        yield number, RowError(f'invalid JSON: {exc}')
+        else:
+            reader = csv.DictReader(fh)
+            for row in reader:
+                yield reader.line_num, row
+    finally:
+        if fh is not sys.stdin:
+            fh.close()
+
+
+def _boolean(value):
+    if isinstance(value, bool):
+        return value
+    return str(value).strip().lower() in ('1', 'true', 'yes', 'y', 'on')
+
+
+def clean_row(row):
+    """Validate and convert one record; only keys present in the record are returned."""
+    if isinstance(row, Exception):
+        raise row
+    data = {}
+    for field in COLUMNS:
+        if field in row and row[field] is not None:
+            value = row[field]
+            data[field] = value.strip() if isinstance(value, str) else value
+    if not data.get('sku'):
+        raise RowError('sku is required')
+    try:
+        if 'price' in data:
+            data['price'] = Decimal(str(data['price']))
+        if 'stock' in data:
+            data['stock'] = int(data['stock'] or 0)
+    except (InvalidOperation, ValueError) as exc:
+        raise RowError(f'bad number: {exc}')
+    for field in BOOLEAN_FIELDS & data.keys():
+        data[field] = _boolean(data[field])
+    return data
+
+
+def _categories(rows):
+    """Map category slug -> Category for a batch, creating missing ones and applying renames."""
+    wanted = {}
+    for row in rows:
+        slug = row.get('category_slug')
+        if slug:
+            wanted.setdefault(slug, row.get('category_name') or '')
+    if not wanted:
+        return {}
+    found = Category.objects.in_bulk(list(wanted), field_name='slug')
+    missing = [Category(slug=slug, name=name or slug.replace('-', ' ').title())
+               for slug, name in wanted.items() if slug not in found]
+    if missing:
+        Category.objects.bulk_create(missing, ignore_conflicts=True)
+        found = Category.objects.in_bulk(list(wanted), field_name='slug')
+    renamed = []
+    for slug, name in wanted.items():
+        category = found.get(slug)
+        if category and name and category.name != name:
+            category.name = name
+            renamed.append(category)
+    if renamed:
+        Category.objects.bulk_update(renamed, ['name'])
+        for category in renamed:
+            listings.sync_category(category)
+    return found
+
+
+def _slug_conflicts(products):
+    """``{sku: RowError}`` for products whose slug another product already has.
+
+    ``products`` are the batch's new products and those being given a new slug;
+    a slug is also refused if an earlier product of the same batch claimed it.
+    """
+    conflicts, claims = {}, {}
+    for product in products:
+        if product.slug in claims:
+            conflicts[product.sku] = RowError(f'slug {product.slug!r} is also used by SKU {claims[product.slug]}')
+        else:
+            claims[product.slug] = product.sku
+    owners = dict(Product.objects.filter(slug__in=list(claims)).values_list('slug', 'sku'))
+    for slug, sku in claims.items():
+        owner = owners.get(slug)
+        if owner is not None and owner != sku:
+            conflicts[sku] = RowError(f'slug {slug!r} already belongs to SKU {owner}')
+    return conflicts
+
+
+def import_batch(rows):
+    """Upsert one batch of cleaned rows. Returns ``(created, updated, unchanged, rejected)``.
+
+    ``rejected`` maps the SKU of every row that could not be applied (its slug
+    belongs to another product) to a ``RowError``; the rest of the batch is
+    still written. The batch, categories included, commits or rolls back as one.
+    """
+    # Later rows for the same SKU win
+    rows = list({row['sku']: row for row in rows}.values())
+    with transaction.atomic():
+        categories = _categories(rows)
+        existing = Product.objects.in_bulk([row['sku'] for row in rows], field_name='sku')
+        now = timezone.now()
+        to_create, to_update, reslugged = [], [], []
+        for row in rows:
+            values = {f: row[f] for f in PRODUCT_FIELDS if f in row and f != 'sku'}
+            if 'category_slug' in row:
+                values['category'] = categories.get(row['category_slug'])
+            product = existing.get(row['sku'])
+            if product is None:
+                values.setdefault('name', row['sku'])
+                values.setdefault('price', Decimal('0'))
+                if not values.get('slug'):
+                    values['slug'] = slugify(f"{values['name']}-{row['sku']}")[:50]
+                to_create.append(Product(sku=row['sku'], **values))
+                continue
+            changed = [f for f, v in values.items() if getattr(product, f) != v]
+            if changed:
+                for f in changed:
+                    setattr(product, f, values[f])
+                # bulk_update() skips auto_now
+                product.updated_at = now
+                to_update.append((product, changed))
+                if 'slug' in changed:
+                    reslugged.append(product)
+
+        rejected = _slug_conflicts(to_create + reslugged)
+        to_create = [p for p in to_create if p.sku not in rejected]
+        to_update = [(p, changed) for p, changed in to_update if p.sku not in rejected]
+        if to_create:
+            Product.objects.bulk_create(to_create)
+        if to_update:
+            fields = {f for _, changed in to_update for f in changed}
+            Product.objects.bulk_update([p for p, _ in to_update], sorted(fields | {'updated_at'}))
+        touched = [p.sku for p in to_create] + [p.sku for p, _ in to_update]
+        if touched:
+            products = list(
+                Product.objects.filter(sku__in=touched).select_related('category').prefetch_related('images')
+            )
+            listings.sync_products(products)
+            get_search_backend().index_products(products)
+    unchanged = len(rows) - len(to_create) - len(to_update) - len(rejected)
+    return len(to_create), len(to_update), unchanged, rejected
+
+
+def finish_import():
+    bump_catalog_version()
+
+
+def export_rows(queryset, chunk_size=EXPORT_CHUNK_SIZE):
+    """Yield one dict per product; memory stays flat regardless of catalog size."""
+    values = queryset.order_by('pk').values_list(
+        *PRODUCT_FIELDS, 'category__slug', 'category__name',
+    ).iterator(chunk_size=chunk_size)
+    for record in values:
+        row = dict(zip(COLUMNS, record))
+        row['price'] = str(row['price'])
+        row['image'] = row['image'] or ''
+        yield row
+
+
+def write_rows(rows, path, fmt):
+    fh = _open(path, 'w')
+    count = 0
+    try:
+        if fmt == 'jsonl':
+            for row in rows:
+                fh.write(json.dumps(row, ensure_ascii=False) + '\n')
+                count += 1
+        else:
+            writer = csv.DictWriter(fh, fieldnames=COLUMNS)
+            writer.writeheader()
+            for row in rows:
+                writer.writerow(row)
+                count += 1
+    finally:
+        if fh is not sys.stdout:
+            fh.close()
+    return count
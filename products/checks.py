@@ -0,0 +1,21 @@
+from django.conf import settings
+from django.core.checks import Warning, register
+
+ATOMIC_COUNTER_BACKENDS = (
+    'django.core.cache.backends.redis.RedisCache',
+    'django.core.cache.backends.memcached.PyMemcacheCache',
+    'django.core.cache.backends.memcached.PyLibMCCache',
+)
+
+
+@register()
+def shared_cache_check(app_configs, **kwargs):
+    """Flash-sale holds (``products.reservations``) need atomic counters in the shared cache."""
+    backend = settings.CACHES.get('shared', {}).get('BACKEND')
+    if backend in ATOMIC_COUNTER_BACKENDS:
+        return []
+    return [Warning(
+        f'The "shared" cache ({backend}) has no atomic incr; concurrent flash-sale holds can be lost.',
+        hint='Set REDIS_URL before running flash sales.',
+        id='products.W001',
+    )]
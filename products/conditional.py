@@ -0,0 +1,73 @@
+"""Validators for conditional GETs on catalog pages.
+
+Used with ``django.views.decorators.http.condition``. The HTML also depends on
+the visitor (cart badge, CSRF tokens in forms, flash messages), so every ETag
+carries a fingerprint of those session parts and views are marked ``Vary:
+Cookie``. A request with pending messages gets no validator at all, so the
+messages are always rendered.
+"""
+import hashlib
+
+from django.conf import settings
+
+from .caching import catalog_version
+from .cart import Cart
+from .models import Product
+
+
+def _digest(text: str) -> str:
+    return hashlib.md5(text.encode()).hexdigest()[:12]
+
+
+def _has_pending_messages(request) -> bool:
+    storage = getattr(request, '_messages', None)
+    # len() loads the messages without marking them as seen
+    return storage is not None and len(storage) > 0
+
+
+def session_fingerprint(request):
+    """Hash of the per-visitor parts of a page, or ``None`` when it must be rendered."""
+    if _has_pending_messages(request):
+        return None
+    parts = [
+        str(request.user.pk) if request.user.is_authenticated else 'anon',
+        Cart(request).fingerprint(),
+        # Form tokens are masked per render but stay valid while the cookie secret does
+        request.COOKIES.get(settings.CSRF_COOKIE_NAME, ''),
+    ]
+    return _digest('|'.join(parts))
+
+
+def catalog_etag(request, *args, **kwargs):
+    """Listing pages change only with the catalog version and the query string."""
+    fingerprint = session_fingerprint(request)
+    if fingerprint is None:
+        return None
+    return f'c{catalog_version()}-{_digest(request.get_full_path())}-{fingerprint}'
+
+
+def _product_state(request, slug):
+    """``(pk, updated_at)`` of the active product, looked up once per request."""
+    cached = getattr(request, '_product_state', None)
+    if cached is None or cached[0] != slug:
+        state = Product.objects.filter(slug=slug, active=True).values_list('pk', 'updated_at').first()
+        cached = request._product_state = (slug, state)
+    return cached[1]
+
+
+def _records_click(request) -> bool:
+    # Opened from search results: the view must run to record the click
+    return bool(request.GET.get('sq'))
+
+
+def product_etag(request, slug):
+    if _records_click(request):
+        return None
+    fingerprint = session_fingerprint(request)
+    state = _product_state(request, slug)
+    if fingerprint is None or state is None:
+        return None
+    pk, updated_at = state
+    # The page also shows related products' cards, which change with the catalog
+    # version; no single timestamp covers them, so there is no Last-Modified
+    return f'p{pk}-{updated_at.timestamp():.6f}-c{catalog_version()}-{fingerprint}'
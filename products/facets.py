@@ -0,0 +1,98 @@
+"""Facet counts for catalog listings.
+
+All counts come from one grouped, conditional-aggregation query over the
+filtered queryset and are cached per normalized filter set and catalog version.
+"""
+import hashlib
+
+from django.core.cache import cache
+from django.db.models import Count, Q
+
+from .caching import catalog_version
+from .search import normalize_query
+
+FACET_CACHE_TIMEOUT = 60 * 15
+# query parameter -> (listing flag, label)
+SALE_FLAGS = {
+    'super': ('is_super_sale', 'Super Sale'),
+    'flash': ('is_flash_sale', 'Flash Sale'),
+    'mega': ('is_mega_sale', 'Mega Sale'),
+    'latest': ('is_latest', 'Latest'),
+}
+FILTER_PARAMS = ('category', 'stock') + tuple(SALE_FLAGS)
+
+
+def compute_facets(queryset):
+    counts = {f'{param}_count': Count('pk', filter=Q(**{field: True})) for param, (field, _) in SALE_FLAGS.items()}
+    rows = queryset.order_by().values('category_slug', 'category_name').annotate(
+        total=Count('pk'),
+        in_stock=Count('pk', filter=Q(stock__gt=0)),
+        **counts,
+    )
+    facets = {
+        'total': 0,
+        'categories': [],
+        'sale': {param: 0 for param in SALE_FLAGS},
+        'stock': {'in_stock': 0, 'out_of_stock': 0},
+    }
+    for row in rows:
+        facets['total'] += row['total']
+        facets['stock']['in_stock'] += row['in_stock']
+        facets['stock']['out_of_stock'] += row['total'] - row['in_stock']
+        for param in SALE_FLAGS:
+            facets['sale'][param] += row[f'{param}_count']
+        if row['category_slug']:
+            facets['categories'].append({
+                'slug': row['category_slug'], 'name': row['category_name'], 'count': row['total'],
+            })
+    facets['categories'].sort(key=lambda c: c['name'])
+    return facets
+
+
+def filter_key(params) -> str:
+    """Stable key for the search/filter parameters that affect facet counts."""
+    parts = [normalize_query(params.get('q', ''))]
+    parts += [f'{name}={params.get(name, "")}' for name in FILTER_PARAMS]
+    return hashlib.md5('|'.join(parts).encode()).hexdigest()
+
+
+def get_facets(queryset, params, scope):
+    """Cached facet counts of ``queryset``.
+
+    ``scope`` names the view building it: views filter differently for the same
+    parameters, so their counts must not share a cache entry.
+    """
+    key = f'catalog:facets:{scope}:{catalog_version()}:{filter_key(params)}'
+    facets = cache.get(key)
+    if facets is None:
+        facets = compute_facets(queryset)
+        cache.set(key, facets, FACET_CACHE_TIMEOUT)
+    return facets
+
+
+def facet_links(facets, params, base_url=''):
+    """Facet options with toggle URLs built from the current query parameters."""
+    def url(name, value):
+        query = params.copy()
+        query.pop('cursor', None)
+        if query.get(name) == value or (value == '1' and query.get(name)):
+            query.pop(name, None)
+        else:
+            query[name] = value
+        return f'{base_url}?{query.urlencode()}'
+
+    return {
+        'total': facets['total'],
+        'categories': [
+            dict(c, url=url('category', c['slug']), active=params.get('category') == c['slug'])
+            for c in facets['categories']
+        ],
+        'sale': [
+            {'label': label, 'count': facets['sale'][param], 'url': url(param, '1'), 'active': bool(params.get(param))}
+            for param, (_, label) in SALE_FLAGS.items()
+        ],
+        'stock': [
+            {'label': label, 'count': facets['stock'][value], 'url': url('stock', value), 'active': params.get('stock') == value}
+            for value, label in (('in_stock', 'In Stock'), ('out_of_stock', 'Out of Stock'))
+        ],
+    }
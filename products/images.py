@@ -0,0 +1,199 @@
+"""Responsive renditions of product, gallery and hero images.
+
+Every upload is rendered at the widths in ``WIDTHS`` (never wider than the
+original) as WebP plus a JPEG fallback. Files are named after a hash of the
+source bytes, so their URLs can be cached forever and identical uploads share
+them. Saving a model schedules the work on a small in-process thread pool after
+the transaction commits; ``manage.py build_image_variants`` backfills existing
+media with a process pool. The ``product_images`` template tags read the
+results through ``renditions``.
+"""
+import hashlib
+import io
+import logging
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import connections, transaction
+from PIL import Image, ImageOps
+
+from .models import ImageVariant
+
+logger = logging.getLogger(__name__)
+
+WIDTHS = {'thumb': 240, 'card': 480, 'detail': 960, 'hero': 1920}
+# Which variants each kind of upload needs
+PRESETS = {
+    'product': ('thumb', 'card', 'detail'),
+    'gallery': ('thumb', 'card', 'detail'),
+    'hero': ('card', 'detail', 'hero'),
+}
+EXTENSIONS = {'webp': 'webp', 'jpeg': 'jpg'}
+CACHE_TIMEOUT = 60 * 60 * 24
+# Sources without renditions yet are re-checked sooner
+MISSING_CACHE_TIMEOUT = 60 * 5
+
+Rendition = namedtuple('Rendition', 'variant format width height content')
+
+
+def _image_settings():
+    return getattr(settings, 'IMAGE_VARIANTS', {}) or {}
+
+
+def source_name(src) -> Optional[str]:
+    """Storage name for an ``ImageFieldFile`` or a media URL such as ``ProductListing.thumbnail_url``."""
+    if not src:
+        return None
+    if isinstance(src, str):
+        if not src.startswith(settings.MEDIA_URL):
+            return None
+        return src[len(settings.MEDIA_URL):]
+    return src.name or None
+
+
+def rendition_path(digest: str, width: int, fmt: str) -> str:
+    return f'variants/{digest[:2]}/{digest}-{width}w.{EXTENSIONS[fmt]}'
+
+
+# ---- Rendering (pure; runs in worker processes) ----
+
+def _flatten(image):
+    """JPEG has no alpha channel: composite transparent images onto white."""
+    if image.mode != 'RGBA':
+        return image
+    background = Image.new('RGB', image.size, (255, 255, 255))
+    background.paste(image, mask=image.getchannel('A'))
+    return background
+
+
+def render(data: bytes, variants, webp_quality=80, jpeg_quality=82):
+    """Return ``(digest, [Rendition, ...])`` for the image in ``data``."""
+    digest = hashlib.sha256(data).hexdigest()[:16]
+    with Image.open(io.BytesIO(data)) as original:
+        original = ImageOps.exif_transpose(original)
+        has_alpha = original.mode in ('RGBA', 'LA') or (original.mode == 'P' and 'transparency' in original.info)
+        base = original.convert('RGBA' if has_alpha else 'RGB')
+
+    renditions = []
+    widths = set()
+    for variant in variants:
+        width = min(WIDTHS[variant], base.width)
+        if width in widths:
+            # A small original caps several variants at the same width
+            continue
+        widths.add(width)
+        height = max(1, round(base.height * width / base.width))
+        resized = base.resize((width, height), Image.LANCZOS) if width < base.width else base
+        webp = io.BytesIO()
+        resized.save(webp, 'WEBP', quality=webp_quality, method=4)
+        jpeg = io.BytesIO()
+        _flatten(resized).save(jpeg, 'JPEG', quality=jpeg_quality, optimize=True, progressive=True)
+        renditions.append(Rendition(variant, 'webp', width, height, webp.getvalue()))
+        renditions.append(Rendition(variant, 'jpeg', width, height, jpeg.getvalue()))
+    return digest, renditions
+
+
+def render_preset(data: bytes, preset: str):
+    config = _image_settings()
+    return render(
+        data, PRESETS[preset],
+        webp_quality=int(config.get('WEBP_QUALITY', 80)),
+        jpeg_quality=int(config.get('JPEG_QUALITY', 82)),
+    )
+
+
+# ---- Storage and lookup ----
+
+def _cache_key(source: str) -> str:
+    return f'images:renditions:{hashlib.md5(source.encode()).hexdigest()}'
+
+
+def store(source: str, digest: str, renditions) -> int:
+    """Write rendition files that do not exist yet and record them for ``source``."""
+    rows = []
+    for r in renditions:
+        path = rendition_path(digest, r.width, r.format)
+        if not default_storage.exists(path):
+            path = default_storage.save(path, ContentFile(r.content))
+        rows.append(ImageVariant(
+            source=source, digest=digest, variant=r.variant, format=r.format,
+            width=r.width, height=r.height, path=path,
+        ))
+    with transaction.atomic():
+        # Variants dropped because the new original is smaller must not linger
+        ImageVariant.objects.filter(source=source).exclude(digest=digest).delete()
+        ImageVariant.objects.bulk_create(
+            rows, update_conflicts=True, unique_fields=['source', 'variant', 'format'],
+            update_fields=['digest', 'width', 'height', 'path'],
+        )
+    cache.delete(_cache_key(source))
+    return len(rows)
+
+
+def generate(source: str, preset: str) -> int:
+    with default_storage.open(source, 'rb') as fh:
+        data = fh.read()
+    digest, renditions = render_preset(data, preset)
+    return store(source, digest, renditions)
+
+
+def renditions(source: str) -> List[dict]:
+    """``[{'variant', 'format', 'width', 'height', 'url'}, ...]`` for ``source``, narrowest first."""
+    key = _cache_key(source)
+    found = cache.get(key)
+    if found is None:
+        found = [
+            {
+                'variant': v.variant, 'format': v.format, 'width': v.width, 'height': v.height,
+                'url': default_storage.url(v.path),
+            }
+            for v in ImageVariant.objects.filter(source=source).order_by('width')
+        ]
+        cache.set(key, found, CACHE_TIMEOUT if found else MISSING_CACHE_TIMEOUT)
+    return found
+
+
+def remove(source: str):
+    """Forget ``source``'s renditions; files still used by another source are kept."""
+    paths = list(ImageVariant.objects.filter(source=source).values_list('path', flat=True))
+    ImageVariant.objects.filter(source=source).delete()
+    shared = set(ImageVariant.objects.filter(path__in=paths).values_list('path', flat=True))
+    for path in set(paths) - shared:
+        default_storage.delete(path)
+    cache.delete(_cache_key(source))
+
+
+# ---- Background generation on upload ----
+
+_executor = None
+
+
+def _get_executor():
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            max_workers=int(_image_settings().get('WORKERS', 2)), thread_name_prefix='image-variants',
+        )
+    return _executor
+
+
+def _generate_in_background(source: str, preset: str):
+    try:
+        generate(source, preset)
+    except Exception:
+        logger.exception("Could not render variants for %s", source)
+    finally:
+        connections.close_all()
+
+
+def schedule(image_field, preset: str):
+    """Render variants for a just-saved image once the transaction commits (no-op if already done)."""
+    source = source_name(image_field)
+    if not source or not _image_settings().get('ENABLED', True) or renditions(source):
+        return
+    transaction.on_commit(lambda: _get_executor().submit(_generate_in_background, source, preset))
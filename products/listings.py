@@ -0,0 +1,115 @@
+"""Maintenance of the ``ProductListing`` read model.
+
+One row per active product, holding exactly what listing templates render.
+Signals call ``sync_products`` / ``sync_category``; ``rebuild`` (and the
+``rebuild_product_listings`` command) regenerates the whole table.
+"""
+from django.db import transaction
+from django.utils.text import Truncator
+
+from .models import Product, ProductListing
+
+LOW_STOCK_THRESHOLD = 5
+SUMMARY_WORDS = 12
+REBUILD_BATCH_SIZE = 500
+UPDATE_FIELDS = [
+    'sku', 'name', 'slug', 'summary', 'price', 'stock', 'stock_bucket', 'category',
+    'category_slug', 'category_name', 'thumbnail_url', 'is_latest', 'is_super_sale',
+    'is_flash_sale', 'is_mega_sale', 'created_at',
+]
+
+
+def stock_bucket(stock: int) -> str:
+    if stock <= 0:
+        return 'out_of_stock'
+    if stock <= LOW_STOCK_THRESHOLD:
+        return 'low_stock'
+    return 'in_stock'
+
+
+def thumbnail_url(product) -> str:
+    """The product image, else the first gallery image."""
+    if product.image:
+        return product.image.url
+    first = next(iter(product.images.all()), None)
+    return first.image.url if first else ''
+
+
+def build_listing(product) -> ProductListing:
+    category = product.category
+    return ProductListing(
+        product=product,
+        sku=product.sku,
+        name=product.name,
+        slug=product.slug,
+        summary=Truncator(Truncator(product.description or '').words(SUMMARY_WORDS)).chars(255),
+        price=product.price,
+        stock=product.stock,
+        stock_bucket=stock_bucket(product.stock),
+        category=category,
+        category_slug=category.slug if category else None,
+        category_name=category.name if category else '',
+        thumbnail_url=thumbnail_url(product),
+        is_latest=product.is_latest,
+        is_super_sale=product.is_super_sale,
+        is_flash_sale=product.is_flash_sale,
+        is_mega_sale=product.is_mega_sale,
+        created_at=product.created_at,
+    )
+
+
+def sync_products(products):
+    """Upsert listings for active products and drop the rest."""
+    products = list(products)
+    ProductListing.objects.filter(pk__in=[p.pk for p in products if not p.active]).delete()
+    rows = [build_listing(p) for p in products if p.active]
+    if rows:
+        ProductListing.objects.bulk_create(
+            rows, update_conflicts=True, unique_fields=['product'], update_fields=UPDATE_FIELDS,
+        )
+
+
+def resync_product_ids(ids):
+    """Re-read products by id and sync them; ids that no longer exist are skipped."""
+    sync_products(Product.objects.filter(pk__in=ids).select_related('category').prefetch_related('images'))
+
+
+def sync_stock(stock):
+    """Write ``{product_id: stock}`` to the listings' stock columns only.
+
+    For bulk stock changes such as checkout, where nothing else a listing shows
+    has moved. Products without a listing (inactive) are skipped.
+    """
+    rows = [ProductListing(pk=pk, stock=units, stock_bucket=stock_bucket(units)) for pk, units in stock.items()]
+    if rows:
+        ProductListing.objects.bulk_update(rows, ['stock', 'stock_bucket'])
+
+
+def sync_category(category):
+    ProductListing.objects.filter(category=category).update(
+        category_slug=category.slug, category_name=category.name,
+    )
+
+
+def clear_category(slug):
+    """Called after a category is deleted (the FK is already nulled)."""
+    ProductListing.objects.filter(category__isnull=True, category_slug=slug).update(
+        category_slug=None, category_name='',
+    )
+
+
+def rebuild(batch_size: int = REBUILD_BATCH_SIZE) -> int:
+    products = Product.objects.filter(active=True).select_related('category').prefetch_related('images')
+    count = 0
+    with transaction.atomic():
+        ProductListing.objects.all().delete()
+        batch = []
+        for product in products.iterator(chunk_size=batch_size):
+            batch.append(build_listing(product))
+            if len(batch) >= batch_size:
+                ProductListing.objects.bulk_create(batch)
+                count += len(batch)
+                batch = []
+        ProductListing.objects.bulk_create(batch)
+        count += len(batch)
+    return count
@@ -0,0 +1,24 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from products.autocomplete import default_path, write_index
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the popularity-weighted autocomplete index (run periodically, e.g. from cron)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--path',
+            default=None,
+            help='Index file to write (default: PRODUCT_SEARCH["AUTOCOMPLETE_PATH"])'
+        )
+
+    def handle(self, *args, **options):
+        path = options['path'] or default_path()
+        started = time.monotonic()
+        labels = write_index(path)
+        self.stdout.write(self.style.SUCCESS(
+            f'Wrote {labels} suggestions to {path} in {time.monotonic() - started:.2f}s'
+        ))
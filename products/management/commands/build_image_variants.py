@@ -0,0 +1,54 @@
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import django
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand
+
+from products import images
+from products.models import HeroSlide, ImageVariant, Product, ProductImage
+
+
+def _render(source, preset):
+    with default_storage.open(source, 'rb') as fh:
+        return images.render_preset(fh.read(), preset)
+
+
+class Command(BaseCommand):
+    help = 'Render responsive image variants for existing product, gallery and hero images'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=os.cpu_count() or 1,
+                            help='Rendering processes (default: CPU count)')
+        parser.add_argument('--force', action='store_true', help='Re-render images that already have variants')
+
+    def sources(self, force):
+        done = set() if force else set(ImageVariant.objects.values_list('source', flat=True).distinct())
+        found = {}
+        for model, preset in ((HeroSlide, 'hero'), (Product, 'product'), (ProductImage, 'gallery')):
+            for name in model.objects.exclude(image='').exclude(image=None).values_list('image', flat=True):
+                if name not in done:
+                    found.setdefault(name, preset)
+        return found.items()
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        pending = list(self.sources(options['force']))
+        rendered = failed = 0
+        # Workers only read, decode and resize; files are written and recorded here
+        with ProcessPoolExecutor(max_workers=options['workers'], initializer=django.setup) as pool:
+            futures = {pool.submit(_render, source, preset): source for source, preset in pending}
+            for future in as_completed(futures):
+                source = futures[future]
+                try:
+                    digest, renditions = future.result()
+                except Exception as exc:
+                    self.stderr.write(f'{source}: {exc}')
+                    failed += 1
+                    continue
+                images.store(source, digest, renditions)
+                rendered += 1
+        self.stdout.write(self.style.SUCCESS(
+            f'Rendered variants for {rendered} images ({failed} failed) in {time.monotonic() - started:.2f}s'
+        ))
@@ -0,0 +1,30 @@
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from products import recommendations
+
+
+class Command(BaseCommand):
+    help = 'Rebuild "frequently bought together" recommendations from order history'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--top', type=int, default=recommendations.TOP_N,
+                            help=f'Recommendations kept per product (default: {recommendations.TOP_N})')
+        parser.add_argument('--min-support', type=int, default=recommendations.MIN_SUPPORT,
+                            help=f'Orders a pair must share to count (default: {recommendations.MIN_SUPPORT})')
+        parser.add_argument('--score', choices=recommendations.SCORES, default='cosine',
+                            help='Ranking score (default: cosine)')
+        parser.add_argument('--days', type=int, default=None, help='Only use orders from the last N days')
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        since = timezone.now() - timedelta(days=options['days']) if options['days'] else None
+        orders, rows = recommendations.build(
+            top_n=options['top'], min_support=options['min_support'], score=options['score'], since=since,
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f'Stored {rows} recommendations from {orders} orders in {time.monotonic() - started:.2f}s'
+        ))
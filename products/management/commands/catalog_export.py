@@ -0,0 +1,34 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from products import catalog_io
+from products.models import Product
+
+
+class Command(BaseCommand):
+    help = 'Stream the product catalog to a CSV or JSON Lines file'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help="Output file ('-' for stdout)")
+        parser.add_argument('--format', choices=catalog_io.FORMATS, default=None,
+                            help='Output format (default: from the file extension, else csv)')
+        parser.add_argument('--chunk-size', type=int, default=catalog_io.EXPORT_CHUNK_SIZE,
+                            help=f'Rows fetched per database round trip (default: {catalog_io.EXPORT_CHUNK_SIZE})')
+        parser.add_argument('--active-only', action='store_true', help='Skip inactive products')
+
+    def handle(self, *args, **options):
+        fmt = catalog_io.detect_format(options['path'], options['format'])
+        queryset = Product.objects.all()
+        if options['active_only']:
+            queryset = queryset.filter(active=True)
+        started = time.monotonic()
+        rows = catalog_io.export_rows(queryset, chunk_size=max(1, options['chunk_size']))
+        try:
+            count = catalog_io.write_rows(rows, options['path'], fmt)
+        except OSError as exc:
+            raise CommandError(str(exc))
+        if options['path'] != '-':
+            self.stdout.write(self.style.SUCCESS(
+                f'Exported {count} products in {time.monotonic() - started:.2f}s'
+            ))
@@ -0,0 +1,74 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import IntegrityError
+
+from products import catalog_io
+
+
+class Command(BaseCommand):
+    help = 'Upsert products and categories by SKU/slug from a CSV or JSON Lines file'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help="CSV or JSONL file ('-' for stdin)")
+        parser.add_argument('--format', choices=catalog_io.FORMATS, default=None,
+                            help='Input format (default: from the file extension, else csv)')
+        parser.add_argument('--batch-size', type=int, default=catalog_io.BATCH_SIZE,
+                            help=f'Rows upserted per batch (default: {catalog_io.BATCH_SIZE})')
+        parser.add_argument('--max-errors', type=int, default=100,
+                            help='Abort after this many invalid rows (default: 100)')
+
+    def handle(self, *args, **options):
+        fmt = catalog_io.detect_format(options['path'], options['format'])
+        batch_size = max(1, options['batch_size'])
+        started = time.monotonic()
+        created = updated = unchanged = errors = 0
+        batch, lines = [], {}
+
+        def reject(line, exc):
+            nonlocal errors
+            errors += 1
+            self.stderr.write(f'line {line}: {exc}')
+            if errors >= options['max_errors']:
+                raise CommandError(f'Aborting after {errors} invalid rows')
+
+        def flush():
+            nonlocal created, updated, unchanged
+            try:
+                c, u, n, rejected = catalog_io.import_batch(batch)
+            except IntegrityError as exc:
+                raise CommandError(f'Batch of {len(batch)} rows failed and was rolled back: {exc}')
+            created, updated, unchanged = created + c, updated + u, unchanged + n
+            batch.clear()
+            for sku, exc in rejected.items():
+                reject(lines[sku], exc)
+            lines.clear()
+            elapsed = time.monotonic() - started
+            total = created + updated + unchanged
+            self.stdout.write(f'{total} rows ({total / elapsed:.0f} rows/s)')
+
+        try:
+            for line, row in catalog_io.read_rows(options['path'], fmt):
+                try:
+                    data = catalog_io.clean_row(row)
+                except catalog_io.RowError as exc:
+                    reject(line, exc)
+                    continue
+                batch.append(data)
+                lines[data['sku']] = line
+                if len(batch) >= batch_size:
+                    flush()
+            if batch:
+                flush()
+        except OSError as exc:
+            raise CommandError(str(exc))
+        finally:
+            # Earlier batches (and their categories) are committed even if a later one failed
+            catalog_io.finish_import()
+
+        elapsed = time.monotonic() - started
+        total = created + updated + unchanged
+        self.stdout.write(self.style.SUCCESS(
+            f'Imported {total} rows in {elapsed:.2f}s ({total / max(elapsed, 1e-6):.0f} rows/s): '
+            f'{created} created, {updated} updated, {unchanged} unchanged, {errors} skipped'
+        ))
@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+
+from products.search import get_search_backend
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the product full-text search index from the catalog'
+
+    def handle(self, *args, **options):
+        backend = get_search_backend()
+        self.stdout.write(f'Rebuilding search index ({backend.name} backend)...')
+        count = backend.rebuild()
+        self.stdout.write(self.style.SUCCESS(f'Indexed {count} active products'))
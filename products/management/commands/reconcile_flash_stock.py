@@ -0,0 +1,21 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from products import reservations
+
+
+class Command(BaseCommand):
+    help = 'Rebuild flash-sale hold counters from product stock, returning expired holds to sale'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--loop', type=int, default=0, metavar='SECONDS',
+                            help='Keep running, reconciling every SECONDS (default: run once)')
+
+    def handle(self, *args, **options):
+        while True:
+            count = reservations.reconcile()
+            self.stdout.write(f'Reconciled {count} flash-sale products')
+            if not options['loop']:
+                break
+            time.sleep(options['loop'])
@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+from django.http import QueryDict
+
+from products.caching import catalog_version, home_sections
+from products.facets import get_facets
+from products.models import ProductListing
+
+
+class Command(BaseCommand):
+    help = ('Pre-build cached homepage sections and default listing facets for the current catalog '
+            'version (needs a shared cache backend such as Redis to benefit web workers)')
+
+    def handle(self, *args, **options):
+        sections = home_sections(refresh=True)
+        get_facets(ProductListing.objects.all(), QueryDict(), 'all_products')
+        self.stdout.write(self.style.SUCCESS(
+            f'Warmed catalog cache v{catalog_version()}: '
+            + ', '.join(f'{name}={len(items)}' for name, items in sections.items())
+        ))
@@ -0,0 +1,62 @@
+from django.db import migrations, OperationalError
+
+
+SQLITE_FORWARD = [
+    "CREATE VIRTUAL TABLE products_product_fts USING fts5("
+    "name, description, sku, category, tokenize = 'unicode61 remove_diacritics 2', prefix = '2 3')",
+    "INSERT INTO products_product_fts (rowid, name, description, sku, category) "
+    "SELECT p.id, p.name, p.description, p.sku, COALESCE(c.name, '') "
+    "FROM products_product p LEFT JOIN products_category c ON c.id = p.category_id WHERE p.active",
+]
+SQLITE_BACKWARD = ["DROP TABLE IF EXISTS products_product_fts"]
+
+POSTGRES_FORWARD = [
+    "CREATE TABLE products_product_search ("
+    "product_id bigint PRIMARY KEY REFERENCES products_product (id) ON DELETE CASCADE DEFERRABLE INITIALLY DEFERRED, "
+    "document tsvector NOT NULL)",
+    "CREATE INDEX products_product_search_document_gin ON products_product_search USING GIN (document)",
+    "INSERT INTO products_product_search (product_id, document) "
+    "SELECT p.id, "
+    "setweight(to_tsvector('simple', coalesce(p.name, '')), 'A') || "
+    "setweight(to_tsvector('simple', coalesce(p.sku, '')), 'A') || "
+    "setweight(to_tsvector('simple', coalesce(c.name, '')), 'B') || "
+    "setweight(to_tsvector('simple', coalesce(p.description, '')), 'C') "
+    "FROM products_product p LEFT JOIN products_category c ON c.id = p.category_id WHERE p.active",
+]
+POSTGRES_BACKWARD = ["DROP TABLE IF EXISTS products_product_search"]
+
+
+def _run(schema_editor, statements):
+    for sql in statements:
+        schema_editor.execute(sql)
+
+
+def create_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'sqlite':
+        try:
+            _run(schema_editor, SQLITE_FORWARD)
+        except OperationalError:
+            # SQLite built without FTS5: products.search falls back to LIKE queries
+            pass
+    elif vendor == 'postgresql':
+        _run(schema_editor, POSTGRES_FORWARD)
+
+
+def drop_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'sqlite':
+        _run(schema_editor, SQLITE_BACKWARD)
+    elif vendor == 'postgresql':
+        _run(schema_editor, POSTGRES_BACKWARD)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0005_productimage'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
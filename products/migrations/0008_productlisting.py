@@ -0,0 +1,39 @@
+# Generated by Django 5.2.18 on 2026-10-16 20:45
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0007_catalog_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProductListing',
+            fields=[
+                ('product', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='listing', serialize=False, to='products.product')),
+                ('sku', models.CharField(max_length=64)),
+                ('name', models.CharField(max_length=255)),
+                ('slug', models.SlugField()),
+                ('summary', models.CharField(blank=True, max_length=255)),
+                ('price', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('stock', models.IntegerField(default=0)),
+                ('stock_bucket', models.CharField(choices=[('in_stock', 'In Stock'), ('low_stock', 'Low Stock'), ('out_of_stock', 'Out of Stock')], max_length=20)),
+                ('category_slug', models.SlugField(blank=True, null=True)),
+                ('category_name', models.CharField(blank=True, max_length=200)),
+                ('thumbnail_url', models.CharField(blank=True, max_length=500)),
+                ('is_latest', models.BooleanField(default=False)),
+                ('is_super_sale', models.BooleanField(default=False)),
+                ('is_flash_sale', models.BooleanField(default=False)),
+                ('is_mega_sale', models.BooleanField(default=False)),
+                ('created_at', models.DateTimeField()),
+                ('category', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='products.category')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['name', 'product'], name='listing_name_idx'), models.Index(fields=['price', 'product'], name='listing_price_idx'), models.Index(fields=['created_at', 'product'], name='listing_created_idx'), models.Index(fields=['stock', 'product'], name='listing_stock_idx'), models.Index(fields=['category_slug', 'name', 'product'], name='listing_cat_name_idx'), models.Index(condition=models.Q(('stock__gt', 0)), fields=['-created_at'], name='listing_instock_recent_idx'), models.Index(condition=models.Q(('is_latest', True)), fields=['product'], name='listing_latest_idx'), models.Index(condition=models.Q(('is_super_sale', True)), fields=['product'], name='listing_super_sale_idx'), models.Index(condition=models.Q(('is_flash_sale', True)), fields=['product'], name='listing_flash_sale_idx'), models.Index(condition=models.Q(('is_mega_sale', True)), fields=['product'], name='listing_mega_sale_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,45 @@
+from django.db import migrations
+from django.utils.text import Truncator
+
+
+def populate_listings(apps, schema_editor):
+    Product = apps.get_model('products', 'Product')
+    ProductListing = apps.get_model('products', 'ProductListing')
+    rows = []
+    for p in Product.objects.filter(active=True).select_related('category').prefetch_related('images'):
+        first_image = next(iter(p.images.all()), None)
+        if p.image:
+            thumbnail = p.image.url
+        else:
+            thumbnail = first_image.image.url if first_image else ''
+        rows.append(ProductListing(
+            product=p,
+            sku=p.sku,
+            name=p.name,
+            slug=p.slug,
+            summary=Truncator(Truncator(p.description or '').words(12)).chars(255),
+            price=p.price,
+            stock=p.stock,
+            stock_bucket='out_of_stock' if p.stock <= 0 else ('low_stock' if p.stock <= 5 else 'in_stock'),
+            category=p.category,
+            category_slug=p.category.slug if p.category else None,
+            category_name=p.category.name if p.category else '',
+            thumbnail_url=thumbnail,
+            is_latest=p.is_latest,
+            is_super_sale=p.is_super_sale,
+            is_flash_sale=p.is_flash_sale,
+            is_mega_sale=p.is_mega_sale,
+            created_at=p.created_at,
+        ))
+    ProductListing.objects.bulk_create(rows, batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0008_productlisting'),
+    ]
+
+    operations = [
+        migrations.RunPython(populate_listings, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 5.2.18 on 2026-10-16 20:52
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0009_populate_productlisting'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ImageVariant',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('source', models.CharField(max_length=255)),
+                ('digest', models.CharField(max_length=16)),
+                ('variant', models.CharField(choices=[('thumb', 'Thumbnail'), ('card', 'Card'), ('detail', 'Detail'), ('hero', 'Hero')], max_length=10)),
+                ('format', models.CharField(choices=[('webp', 'WebP'), ('jpeg', 'JPEG')], max_length=4)),
+                ('width', models.PositiveIntegerField()),
+                ('height', models.PositiveIntegerField()),
+                ('path', models.CharField(max_length=255)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'ordering': ['source', 'width'],
+                'unique_together': {('source', 'variant', 'format')},
+            },
+        ),
+    ]
@@ -0,0 +1,53 @@
+# Generated by Django 5.2.18 on 2026-10-16 22:05
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0013_storedcart'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='product',
+            name='product_active_name_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='product',
+            name='product_active_price_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='product',
+            name='product_active_created_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='product',
+            name='product_active_stock_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='product',
+            name='product_active_cat_name_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='product',
+            name='product_instock_recent_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='product',
+            name='product_latest_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='product',
+            name='product_super_sale_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='product',
+            name='product_flash_sale_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='product',
+            name='product_mega_sale_idx',
+        ),
+    ]
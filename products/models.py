@@ -1,3 +1,4 @@
+from django.conf import settings
 from django.db import models
 
 class Category(models.Model):
@@ -22,6 +23,9 @@ class Product(models.Model):
     is_mega_sale = models.BooleanField(default=False)
     active = models.BooleanField(default=True)
     created_at = models.DateTimeField(auto_now_add=True)
+    # Also touched when gallery images change; drives product_detail's ETag
+    updated_at = models.DateTimeField(auto_now=True)
+
     def __str__(self):
         return self.name
 
@@ -40,6 +44,54 @@ class ProductImage(models.Model):
     def __str__(self):
         return f"{self.product.name} image #{self.pk}"
 
+class ProductListing(models.Model):
+    """Flat read model of an active product: exactly what listing templates render.
+
+    Kept in sync by ``products.signals`` (see ``products.listings``) so catalog
+    pages filter, sort and render without joining Category or ProductImage.
+    """
+    STOCK_BUCKETS = [
+        ('in_stock', 'In Stock'),
+        ('low_stock', 'Low Stock'),
+        ('out_of_stock', 'Out of Stock'),
+    ]
+    product = models.OneToOneField(Product, on_delete=models.CASCADE, primary_key=True, related_name='listing')
+    sku = models.CharField(max_length=64)
+    name = models.CharField(max_length=255)
+    slug = models.SlugField()
+    summary = models.CharField(max_length=255, blank=True)
+    price = models.DecimalField(max_digits=10, decimal_places=2)
+    stock = models.IntegerField(default=0)
+    stock_bucket = models.CharField(max_length=20, choices=STOCK_BUCKETS)
+    category = models.ForeignKey(Category, on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+    category_slug = models.SlugField(blank=True, null=True)
+    category_name = models.CharField(max_length=200, blank=True)
+    thumbnail_url = models.CharField(max_length=500, blank=True)
+    is_latest = models.BooleanField(default=False)
+    is_super_sale = models.BooleanField(default=False)
+    is_flash_sale = models.BooleanField(default=False)
+    is_mega_sale = models.BooleanField(default=False)
+    created_at = models.DateTimeField()
+
+    class Meta:
+        # Catalog access paths; checked by products.tests.CatalogQueryPlanTests
+        indexes = [
+            models.Index(fields=['name', 'product'], name='listing_name_idx'),
+            models.Index(fields=['price', 'product'], name='listing_price_idx'),
+            models.Index(fields=['created_at', 'product'], name='listing_created_idx'),
+            models.Index(fields=['stock', 'product'], name='listing_stock_idx'),
+            models.Index(fields=['category_slug', 'name', 'product'], name='listing_cat_name_idx'),
+            models.Index(fields=['-created_at'], condition=models.Q(stock__gt=0), name='listing_instock_recent_idx'),
+            models.Index(fields=['product'], condition=models.Q(is_latest=True), name='listing_latest_idx'),
+            models.Index(fields=['product'], condition=models.Q(is_super_sale=True), name='listing_super_sale_idx'),
+            models.Index(fields=['product'], condition=models.Q(is_flash_sale=True), name='listing_flash_sale_idx'),
+            models.Index(fields=['product'], condition=models.Q(is_mega_sale=True), name='listing_mega_sale_idx'),
+        ]
+
+    def __str__(self):
+        return self.name
+
+
 class HeroSlide(models.Model):
     title = models.CharField(max_length=200)
     subtitle = models.CharField(max_length=255, blank=True)
@@ -55,3 +107,93 @@ class HeroSlide(models.Model):
 
     def __str__(self):
         return self.title
+
+
+class RelatedProduct(models.Model):
+    """Precomputed "frequently bought together" pairs; see ``manage.py build_related_products``."""
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='related_products')
+    related = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='+')
+    score = models.FloatField()
+    rank = models.PositiveSmallIntegerField()
+
+    class Meta:
+        unique_together = ['product', 'related']
+        ordering = ['product', 'rank']
+        indexes = [
+            models.Index(fields=['product', 'rank'], name='related_product_rank_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.product_id} -> {self.related_id} ({self.score:.3f})"
+
+
+class ImageVariant(models.Model):
+    """A resized rendition of an uploaded image (see ``products.images``)."""
+    VARIANTS = [
+        ('thumb', 'Thumbnail'),
+        ('card', 'Card'),
+        ('detail', 'Detail'),
+        ('hero', 'Hero'),
+    ]
+    FORMATS = [
+        ('webp', 'WebP'),
+        ('jpeg', 'JPEG'),
+    ]
+
+    # Storage name of the original upload, e.g. "products/shirt.png"
+    source = models.CharField(max_length=255)
+    digest = models.CharField(max_length=16)
+    variant = models.CharField(max_length=10, choices=VARIANTS)
+    format = models.CharField(max_length=4, choices=FORMATS)
+    width = models.PositiveIntegerField()
+    height = models.PositiveIntegerField()
+    path = models.CharField(max_length=255)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        unique_together = ['source', 'variant', 'format']
+        ordering = ['source', 'width']
+
+    def __str__(self):
+        return self.path
+
+
+class StoredCart(models.Model):
+    """A cart persisted by the ``database`` cart store (``settings.CART_STORE``).
+
+    Owned by a user, or by an anonymous session through ``session['cart_id']``.
+    ``count`` and ``total`` mirror the session cart summary so the header badge
+    needs only this row.
+    """
+    user = models.OneToOneField(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, null=True, blank=True, related_name='stored_cart')
+    count = models.PositiveIntegerField(default=0)
+    # Last priced total; cleared whenever a line changes
+    total = models.DecimalField(max_digits=12, decimal_places=2, null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            # abandoned-cart reports: non-empty carts by last activity
+            models.Index(fields=['updated_at'], condition=models.Q(count__gt=0), name='storedcart_active_idx'),
+        ]
+
+    def __str__(self):
+        return f"Cart #{self.pk} ({self.user or 'anonymous'})"
+
+
+class StoredCartLine(models.Model):
+    cart = models.ForeignKey(StoredCart, on_delete=models.CASCADE, related_name='lines')
+    sku = models.CharField(max_length=64, db_index=True)
+    qty = models.PositiveIntegerField()
+    added_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['cart', 'sku'], name='storedcartline_cart_sku_uniq'),
+        ]
+        ordering = ['added_at', 'id']
+
+    def __str__(self):
+        return f"{self.sku} x {self.qty}"
@@ -0,0 +1,105 @@
+"""Keyset (cursor) pagination for catalog listings.
+
+Pages are addressed by the last row's ``(sort value, id)`` instead of an
+OFFSET, so page 500 costs the same index range scan as page 1 and rows do not
+shift between pages when products are added.
+"""
+import base64
+import datetime
+import json
+from decimal import Decimal, InvalidOperation
+
+from django.db.models import Q
+
+# order_by option -> (field, descending)
+SORTS = {
+    'name': ('name', False),
+    'price': ('price', False),
+    'price_desc': ('price', True),
+    'created_at': ('created_at', False),
+    'stock_desc': ('stock', True),
+}
+DEFAULT_SORT = 'name'
+
+
+def _dump(value):
+    if isinstance(value, Decimal):
+        return str(value)
+    if isinstance(value, datetime.datetime):
+        return value.isoformat()
+    return value
+
+
+def _load(field, value):
+    if field == 'price':
+        return Decimal(value)
+    if field == 'created_at':
+        return datetime.datetime.fromisoformat(value)
+    if field == 'stock':
+        return int(value)
+    return str(value)
+
+
+class KeysetPage:
+    def __init__(self, object_list, next_cursor):
+        self.object_list = object_list
+        self.next_cursor = next_cursor
+
+    @property
+    def has_next(self):
+        return self.next_cursor is not None
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+
+class KeysetPaginator:
+    """Paginate ``queryset`` by one of ``SORTS`` with ``id`` as the tie-breaker."""
+
+    def __init__(self, queryset, sort=DEFAULT_SORT, per_page=24):
+        self.sort = sort if sort in SORTS else DEFAULT_SORT
+        self.field, self.descending = SORTS[self.sort]
+        self.per_page = per_page
+        prefix = '-' if self.descending else ''
+        self.queryset = queryset.order_by(f'{prefix}{self.field}', f'{prefix}pk')
+
+    def encode_cursor(self, obj):
+        payload = [self.sort, _dump(getattr(obj, self.field)), obj.pk]
+        return base64.urlsafe_b64encode(json.dumps(payload, separators=(',', ':')).encode()).decode().rstrip('=')
+
+    def decode_cursor(self, cursor):
+        """Return ``(value, id)`` or ``None`` for a missing, foreign or malformed cursor."""
+        if not cursor:
+            return None
+        try:
+            padded = cursor + '=' * (-len(cursor) % 4)
+            sort, value, pk = json.loads(base64.urlsafe_b64decode(padded.encode()))
+            if sort != self.sort:
+                return None
+            return _load(self.field, value), int(pk)
+        except (ValueError, TypeError, InvalidOperation):
+            return None
+
+    def queryset_after(self, position):
+        """Rows strictly after ``(value, id)`` in sort order.
+
+        ``(k > v OR (k = v AND id > pk))`` is written as ``k >= v AND (k > v OR id > pk)``
+        so the leading range condition can seek into the ``(k, id)`` index.
+        """
+        if position is None:
+            return self.queryset
+        value, pk = position
+        op = 'lt' if self.descending else 'gt'
+        return self.queryset.filter(
+            Q(**{f'{self.field}__{op}e': value}),
+            Q(**{f'{self.field}__{op}': value}) | Q(**{f'pk__{op}': pk}),
+        )
+
+    def page(self, cursor=None):
+        qs = self.queryset_after(self.decode_cursor(cursor))
+        rows = list(qs[:self.per_page + 1])
+        next_cursor = self.encode_cursor(rows[self.per_page - 1]) if len(rows) > self.per_page else None
+        return KeysetPage(rows[:self.per_page], next_cursor)
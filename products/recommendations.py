@@ -0,0 +1,124 @@
+"""Frequently-bought-together recommendations from order history.
+
+``build`` streams ``(order, product)`` pairs in order-id order, counts how often
+each pair of products shares a basket in a sparse dict-of-dicts, and keeps the
+top ``top_n`` partners per product by cosine similarity or lift. Memory grows
+with the number of distinct co-purchased pairs, not with order lines. The
+result replaces the ``RelatedProduct`` table in one transaction;
+``product_detail`` reads it with a single indexed query.
+"""
+import heapq
+import math
+from collections import defaultdict
+from itertools import combinations
+
+from django.db import transaction
+from django.utils import timezone
+
+from .models import Product, RelatedProduct
+
+TOP_N = 8
+MIN_SUPPORT = 2
+# Bulk orders say little about affinity and cost O(n^2) pairs
+MAX_BASKET = 50
+SCORES = ('cosine', 'lift')
+
+
+def baskets(since=None, chunk_size=5000):
+    """Yield the set of product ids in each non-cancelled order."""
+    from orders.models import OrderItem
+
+    items = OrderItem.objects.exclude(product=None).exclude(order__status='cancelled')
+    if since is not None:
+        items = items.filter(order__created_at__gte=since)
+    current, basket = None, set()
+    for order_id, product_id in items.order_by('order_id').values_list('order_id', 'product_id').iterator(
+        chunk_size=chunk_size
+    ):
+        if order_id != current:
+            if basket:
+                yield basket
+            current, basket = order_id, set()
+        basket.add(product_id)
+    if basket:
+        yield basket
+
+
+def count_pairs(order_baskets):
+    """Return ``(orders, product counts, pair counts)``; pairs are keyed ``a < b``."""
+    orders = 0
+    counts = defaultdict(int)
+    pairs = defaultdict(lambda: defaultdict(int))
+    for basket in order_baskets:
+        orders += 1
+        for pk in basket:
+            counts[pk] += 1
+        if len(basket) > MAX_BASKET:
+            continue
+        for a, b in combinations(sorted(basket), 2):
+            pairs[a][b] += 1
+    return orders, counts, pairs
+
+
+def top_related(orders, counts, pairs, top_n=TOP_N, min_support=MIN_SUPPORT, score='cosine'):
+    """``{product: [(score, related), ...]}`` best first."""
+    heaps = defaultdict(list)
+    for a, partners in pairs.items():
+        for b, together in partners.items():
+            if together < min_support:
+                continue
+            if score == 'lift':
+                value = together * orders / (counts[a] * counts[b])
+            else:
+                value = together / math.sqrt(counts[a] * counts[b])
+            for product, related in ((a, b), (b, a)):
+                heap = heaps[product]
+                if len(heap) < top_n:
+                    heapq.heappush(heap, (value, together, related))
+                elif (value, together, related) > heap[0]:
+                    heapq.heapreplace(heap, (value, together, related))
+    return {
+        product: [(value, related) for value, _, related in sorted(heap, reverse=True)]
+        for product, heap in heaps.items()
+    }
+
+
+def _current():
+    current = defaultdict(list)
+    for product_id, related_id in RelatedProduct.objects.order_by('product', 'rank').values_list(
+        'product_id', 'related_id'
+    ):
+        current[product_id].append(related_id)
+    return current
+
+
+def build(top_n=TOP_N, min_support=MIN_SUPPORT, score='cosine', since=None, batch_size=1000):
+    """Recompute and store recommendations. Returns ``(orders, rows written)``."""
+    orders, counts, pairs = count_pairs(baskets(since))
+    related = top_related(orders, counts, pairs, top_n=top_n, min_support=min_support, score=score)
+    existing = set(Product.objects.values_list('pk', flat=True))
+    rows = [
+        RelatedProduct(product_id=product, related_id=other, score=value, rank=rank)
+        for product, ranked in related.items() if product in existing
+        for rank, (value, other) in enumerate((r for r in ranked if r[1] in existing), start=1)
+    ]
+    before = _current()
+    with transaction.atomic():
+        RelatedProduct.objects.all().delete()
+        RelatedProduct.objects.bulk_create(rows, batch_size=batch_size)
+        # Detail pages whose cross-sell changed must not be served from a stale ETag
+        after = defaultdict(list)
+        for row in rows:
+            after[row.product_id].append(row.related_id)
+        changed = [pk for pk in set(before) | set(after) if before.get(pk) != after.get(pk)]
+        for start in range(0, len(changed), batch_size):
+            Product.objects.filter(pk__in=changed[start:start + batch_size]).update(updated_at=timezone.now())
+    return orders, len(rows)
+
+
+def related_listings(product, limit=TOP_N):
+    """Listings of ``product``'s recommendations that are still on sale, best first."""
+    recommendations = RelatedProduct.objects.filter(
+        product=product, related__listing__isnull=False,
+    ).select_related('related__listing').order_by('rank')[:limit]
+    return [rec.related.listing for rec in recommendations]
@@ -0,0 +1,232 @@
+"""Flash-sale stock holds kept in the cache instead of on the product row.
+
+While a product is ``is_flash_sale``, putting it in a cart takes a hold: the
+units are counted against two cache counters per product,
+
+* ``limit``: the product's stock when the counters were last reconciled, and
+* ``taken``: units held or sold since then,
+
+and a hold succeeds only if ``taken`` stays within ``limit``. ``taken`` only
+moves through atomic ``incr``/``decr``, so buyers racing for the last units
+never meet on a database row.
+
+Holds live in the holder's session and expire after ``HOLD_SECONDS``. The
+cache also keeps per-minute buckets of held units, so ``reconcile`` can
+rebuild the counters from the database as ``limit = stock`` and ``taken =
+units in unexpired buckets``. That is how expired holds go back on sale: a
+hold that does not fit triggers one reconcile before it is refused, and
+``manage.py reconcile_flash_stock --loop 60`` keeps the counters current.
+
+Checkout converts holds into the real ``Product.stock`` decrement (see
+``orders.checkout``), which remains guarded by the database, so a stale or
+evicted counter can at worst turn a buyer away, never oversell.
+
+The counters live in the ``shared`` cache alias so every worker (and the
+reconcile command) sees the same ones. Holds are only race-free when that
+cache's ``incr`` is atomic, i.e. Redis (``REDIS_URL``); the file-cache
+fallback reads and rewrites, so concurrent holds can be lost and a flash sale
+may turn buyers away early. ``products.checks`` warns about that setup.
+"""
+import time
+
+from django.conf import settings
+from django.core.cache import cache, caches
+
+from .caching import catalog_version
+from .models import Product
+
+BUCKET_SECONDS = 60
+
+
+def _settings():
+    return getattr(settings, 'FLASH_SALE', {}) or {}
+
+
+def hold_seconds() -> int:
+    return int(_settings().get('HOLD_SECONDS', 600))
+
+
+class SoldOut(Exception):
+    def __init__(self, sku, available):
+        self.sku = sku
+        self.available = max(available, 0)
+        super().__init__(f'{sku}: only {self.available} left')
+
+
+def _counters():
+    """The cache holding the hold counters, shared by every process."""
+    return caches['shared']
+
+
+def flash_products():
+    """``{sku: pk}`` of active flash-sale products, cached per catalog version."""
+    key = f'flash:products:{catalog_version()}'
+    products = cache.get(key)
+    if products is None:
+        products = dict(Product.objects.filter(active=True, is_flash_sale=True).values_list('sku', 'pk'))
+        cache.set(key, products, 60 * 60)
+    return products
+
+
+def _limit_key(pk):
+    return f'flash:{pk}:limit'
+
+
+def _taken_key(pk):
+    return f'flash:{pk}:taken'
+
+
+def _bucket_key(pk, bucket):
+    return f'flash:{pk}:held:{bucket}'
+
+
+def _expiry_bucket(now):
+    """Holds taken now expire at the end of this bucket (bucket ``b`` ends at ``b * BUCKET_SECONDS``)."""
+    return -int(-(now + hold_seconds()) // BUCKET_SECONDS)
+
+
+def _live_buckets(now):
+    return range(int(now // BUCKET_SECONDS) + 1, _expiry_bucket(now) + 1)
+
+
+def _incr(key, delta, timeout=None, create=False):
+    """Atomic add. A missing counter is created only with ``create``; otherwise the
+    change is dropped and the next ``reconcile`` rebuilds it."""
+    if not delta:
+        return
+    try:
+        if delta > 0:
+            _counters().incr(key, delta)
+        else:
+            _counters().decr(key, -delta)
+    except ValueError:
+        if create and delta > 0 and not _counters().add(key, delta, timeout):
+            _counters().incr(key, delta)
+
+
+def held_units(pk, now=None) -> int:
+    now = time.time() if now is None else now
+    held = _counters().get_many([_bucket_key(pk, b) for b in _live_buckets(now)])
+    return sum(held.values())
+
+
+def reconcile(pks=None) -> int:
+    """Rebuild the counters of flash-sale products from the database; returns how many."""
+    if pks is None:
+        pks = flash_products().values()
+    stock = dict(Product.objects.filter(pk__in=list(pks)).values_list('pk', 'stock'))
+    now = time.time()
+    for pk, units in stock.items():
+        _counters().set_many({_limit_key(pk): max(units, 0), _taken_key(pk): held_units(pk, now)}, None)
+    return len(stock)
+
+
+def available(pk) -> int:
+    values = _counters().get_many([_limit_key(pk), _taken_key(pk)])
+    return values.get(_limit_key(pk), 0) - values.get(_taken_key(pk), 0)
+
+
+def _take(pk, qty, retry=True) -> bool:
+    if _counters().get(_limit_key(pk)) is None or _counters().get(_taken_key(pk)) is None:
+        reconcile([pk])
+    try:
+        taken = _counters().incr(_taken_key(pk), qty)
+    except ValueError:
+        # Evicted between the check and the increment
+        reconcile([pk])
+        taken = _counters().incr(_taken_key(pk), qty)
+    if taken > _counters().get(_limit_key(pk), 0):
+        _counters().decr(_taken_key(pk), qty)
+        if retry:
+            # Expired holds may still be counted; recount once before saying no
+            reconcile([pk])
+            return _take(pk, qty, retry=False)
+        return False
+    return True
+
+
+def _holds(request):
+    return request.session.get('flash_holds', {})
+
+
+def _live_hold(request, pk, now):
+    """``(qty, bucket)`` of the visitor's unexpired hold on ``pk``, else ``(0, None)``."""
+    qty, bucket = _holds(request).get(str(pk), (0, None))
+    if bucket is None or bucket * BUCKET_SECONDS <= now:
+        return 0, None
+    return qty, bucket
+
+
+def _store_hold(request, pk, qty, bucket):
+    holds = dict(_holds(request))
+    if qty:
+        holds[str(pk)] = [qty, bucket]
+    else:
+        holds.pop(str(pk), None)
+    request.session['flash_holds'] = holds
+
+
+def held(request, sku) -> int:
+    """Units of ``sku`` this visitor holds right now (0 for non-flash products)."""
+    pk = flash_products().get(sku)
+    if pk is None:
+        return 0
+    return _live_hold(request, pk, time.time())[0]
+
+
+def reserve(request, sku, qty):
+    """Hold ``qty`` units of ``sku`` for this visitor (their new cart quantity).
+
+    Growing a hold takes only the extra units; shrinking gives units back.
+    Either way the hold's expiry restarts. Non-flash products are ignored.
+    Raises ``SoldOut`` if the extra units are not available; its ``available``
+    counts the visitor's own hold, so it is the most they can have.
+    """
+    pk = flash_products().get(sku)
+    if pk is None:
+        return
+    now = time.time()
+    held, bucket = _live_hold(request, pk, now)
+    if qty > held and not _take(pk, qty - held):
+        raise SoldOut(sku, available(pk) + held)
+    if qty < held:
+        _incr(_taken_key(pk), qty - held)
+    timeout = hold_seconds() + 2 * BUCKET_SECONDS
+    if held:
+        _incr(_bucket_key(pk, bucket), -held)
+    new_bucket = _expiry_bucket(now) if qty else None
+    if qty:
+        _incr(_bucket_key(pk, new_bucket), qty, timeout, create=True)
+    _store_hold(request, pk, qty, new_bucket)
+
+
+def release_all(request):
+    """Give back every hold, e.g. when the cart is emptied."""
+    now = time.time()
+    for pk in list(_holds(request)):
+        held, bucket = _live_hold(request, pk, now)
+        if held:
+            _incr(_taken_key(pk), -held)
+            _incr(_bucket_key(pk, bucket), -held)
+    if 'flash_holds' in request.session:
+        del request.session['flash_holds']
+
+
+def consume(request, filled):
+    """Turn holds into sold units after checkout committed ``{sku: qty}``.
+
+    Sold units stay counted in ``taken`` (the stock they came from is gone);
+    units held beyond what was sold go back, and flash units sold without a
+    hold are added so the counter still matches the stock.
+    """
+    products = flash_products()
+    now = time.time()
+    for sku, sold in filled.items():
+        pk = products.get(sku)
+        if pk is None:
+            continue
+        held, bucket = _live_hold(request, pk, now)
+        _incr(_taken_key(pk), sold - held)
+        if held:
+            _incr(_bucket_key(pk, bucket), -held)
+        _store_hold(request, pk, 0, None)
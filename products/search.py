@@ -0,0 +1,369 @@
+"""Pluggable full-text search backends for the product catalog.
+
+Every backend answers ``search(query, limit)`` with a list of product ids
+ordered by relevance and ``count(query)`` with the number of matches, and
+keeps its own index current through ``index_products`` / ``remove_products``
+(called from ``products.signals``).
+
+``cached_search_results`` memoizes the ranked ids and the total per normalized
+query and catalog version, so repeated searches skip the backend entirely.
+"""
+import hashlib
+import logging
+import re
+from typing import Iterable, List, Tuple
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DatabaseError, connection, transaction
+from django.db.models import Case, IntegerField, Q, Value, When
+
+from .caching import catalog_version
+from .models import Product
+
+logger = logging.getLogger(__name__)
+
+WORD_RE = re.compile(r'\w+', re.UNICODE)
+FTS_TABLE = 'products_product_fts'
+PG_TABLE = 'products_product_search'
+INDEX_BATCH_SIZE = 500
+SEARCH_CACHE_TIMEOUT = 60 * 15
+
+
+def _search_settings():
+    return getattr(settings, 'PRODUCT_SEARCH', {}) or {}
+
+
+def tokenize(query: str) -> List[str]:
+    return WORD_RE.findall((query or '').lower())
+
+
+def _indexable(products: Iterable[Product]):
+    """Split products into (active products to index, ids to drop from the index)."""
+    keep, drop = [], []
+    for p in products:
+        (keep if p.active else drop).append(p)
+    return keep, [p.pk for p in drop]
+
+
+class LikeSearchBackend:
+    """Portable fallback: ``icontains`` scans with a CASE relevance score."""
+
+    name = 'like'
+    # Whole-query phrase matches score higher, so word order changes results
+    order_sensitive = True
+
+    def _matches(self, query: str):
+        query_words = tokenize(query)
+        if not query_words:
+            return None
+
+        word_conditions = Q()
+        for word in query_words:
+            if len(word) > 2:  # Only search for words longer than 2 characters
+                word_conditions |= Q(name__icontains=word) | Q(description__icontains=word)
+
+        conditions = (
+            Q(name__icontains=query) | Q(description__icontains=query) | Q(sku__icontains=query)
+            | Q(category__name__icontains=query) | word_conditions
+        )
+        return Product.objects.filter(active=True).filter(conditions)
+
+    def search(self, query: str, limit: int) -> List[int]:
+        query = query.strip().lower()
+        matches = self._matches(query)
+        if matches is None:
+            return []
+        return list(
+            matches.annotate(
+                relevance_score=Case(
+                    When(name__iexact=query, then=100),
+                    When(sku__iexact=query, then=95),
+                    When(name__istartswith=query, then=80),
+                    When(sku__istartswith=query, then=75),
+                    When(name__icontains=query, then=60),
+                    When(sku__icontains=query, then=50),
+                    When(description__icontains=query, then=40),
+                    When(category__name__icontains=query, then=30),
+                    default=20,
+                    output_field=IntegerField(),
+                )
+            ).order_by('-relevance_score', 'name').values_list('pk', flat=True)[:limit]
+        )
+
+    def count(self, query: str) -> int:
+        matches = self._matches(query.strip().lower())
+        return matches.count() if matches is not None else 0
+
+    def index_products(self, products):
+        pass
+
+    def remove_products(self, ids):
+        pass
+
+    def rebuild(self):
+        return 0
+
+
+class SQLiteFTSBackend:
+    """SQLite FTS5 virtual table ranked with BM25.
+
+    Columns are weighted name > sku > category > description. Every token is
+    matched as a prefix so partially typed words still hit the index.
+    """
+
+    name = 'sqlite_fts'
+    order_sensitive = False
+    # bm25() column weights: name, description, sku, category
+    weights = (10.0, 1.0, 8.0, 4.0)
+
+    @staticmethod
+    def is_available() -> bool:
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = %s", [FTS_TABLE])
+            return cursor.fetchone() is not None
+
+    def _match_expression(self, words, operator):
+        return f' {operator} '.join('"%s"*' % w.replace('"', '') for w in words)
+
+    def search(self, query: str, limit: int) -> List[int]:
+        words = tokenize(query)
+        if not words:
+            return []
+        sql = (
+            f'SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s '
+            f'ORDER BY bm25({FTS_TABLE}, {", ".join(str(w) for w in self.weights)}) LIMIT %s'
+        )
+        with connection.cursor() as cursor:
+            # Require every word first; widen to any word if that finds nothing
+            for operator in ('AND', 'OR'):
+                cursor.execute(sql, [self._match_expression(words, operator), limit])
+                ids = [row[0] for row in cursor.fetchall()]
+                if ids or len(words) == 1:
+                    return ids
+        return []
+
+    def count(self, query: str) -> int:
+        words = tokenize(query)
+        if not words:
+            return 0
+        sql = f'SELECT count(*) FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s'
+        with connection.cursor() as cursor:
+            # Same AND-then-OR widening as search()
+            for operator in ('AND', 'OR'):
+                cursor.execute(sql, [self._match_expression(words, operator)])
+                total = cursor.fetchone()[0]
+                if total or len(words) == 1:
+                    return total
+        return 0
+
+    def remove_products(self, ids):
+        ids = list(ids)
+        if not ids:
+            return
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'DELETE FROM {FTS_TABLE} WHERE rowid IN ({", ".join(["%s"] * len(ids))})', ids
+            )
+
+    def index_products(self, products):
+        keep, drop = _indexable(products)
+        # Delete and re-insert as one unit, or two writers indexing the same
+        # product can interleave and collide on its rowid
+        with transaction.atomic():
+            self.remove_products(drop + [p.pk for p in keep])
+            if not keep:
+                return
+            with connection.cursor() as cursor:
+                cursor.executemany(
+                    f'INSERT INTO {FTS_TABLE} (rowid, name, description, sku, category) VALUES (%s, %s, %s, %s, %s)',
+                    [(p.pk, p.name, p.description, p.sku, p.category.name if p.category_id else '') for p in keep],
+                )
+
+    def rebuild(self):
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {FTS_TABLE}')
+            cursor.execute(
+                f'INSERT INTO {FTS_TABLE} (rowid, name, description, sku, category) '
+                'SELECT p.id, p.name, p.description, p.sku, COALESCE(c.name, \'\') '
+                'FROM products_product p LEFT JOIN products_category c ON c.id = p.category_id '
+                'WHERE p.active'
+            )
+            return cursor.rowcount
+
+
+class PostgresSearchBackend:
+    """PostgreSQL ``tsvector`` document table with a GIN index, ranked by ``ts_rank``."""
+
+    name = 'postgres'
+    order_sensitive = False
+    config = 'simple'
+    document_sql = (
+        "setweight(to_tsvector('simple', coalesce(%s, '')), 'A') || "
+        "setweight(to_tsvector('simple', coalesce(%s, '')), 'A') || "
+        "setweight(to_tsvector('simple', coalesce(%s, '')), 'B') || "
+        "setweight(to_tsvector('simple', coalesce(%s, '')), 'C')"
+    )
+
+    @staticmethod
+    def is_available() -> bool:
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT to_regclass(%s)', [PG_TABLE])
+            return cursor.fetchone()[0] is not None
+
+    def search(self, query: str, limit: int) -> List[int]:
+        words = tokenize(query)
+        if not words:
+            return []
+        sql = (
+            f'SELECT product_id FROM {PG_TABLE}, to_tsquery(%s, %s) q '
+            'WHERE document @@ q ORDER BY ts_rank(document, q) DESC, product_id LIMIT %s'
+        )
+        with connection.cursor() as cursor:
+            for operator in (' & ', ' | '):
+                cursor.execute(sql, [self.config, operator.join(f'{w}:*' for w in words), limit])
+                ids = [row[0] for row in cursor.fetchall()]
+                if ids or len(words) == 1:
+                    return ids
+        return []
+
+    def count(self, query: str) -> int:
+        words = tokenize(query)
+        if not words:
+            return 0
+        sql = f'SELECT count(*) FROM {PG_TABLE}, to_tsquery(%s, %s) q WHERE document @@ q'
+        with connection.cursor() as cursor:
+            for operator in (' & ', ' | '):
+                cursor.execute(sql, [self.config, operator.join(f'{w}:*' for w in words)])
+                total = cursor.fetchone()[0]
+                if total or len(words) == 1:
+                    return total
+        return 0
+
+    def remove_products(self, ids):
+        ids = list(ids)
+        if not ids:
+            return
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {PG_TABLE} WHERE product_id = ANY(%s)', [ids])
+
+    def index_products(self, products):
+        keep, drop = _indexable(products)
+        self.remove_products(drop)
+        if not keep:
+            return
+        with connection.cursor() as cursor:
+            cursor.executemany(
+                f'INSERT INTO {PG_TABLE} (product_id, document) VALUES (%s, {self.document_sql}) '
+                'ON CONFLICT (product_id) DO UPDATE SET document = EXCLUDED.document',
+                [(p.pk, p.name, p.sku, p.category.name if p.category_id else '', p.description) for p in keep],
+            )
+
+    def rebuild(self):
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {PG_TABLE}')
+            cursor.execute(
+                f'INSERT INTO {PG_TABLE} (product_id, document) '
+                f'SELECT p.id, {self.document_sql % ("p.name", "p.sku", "c.name", "p.description")} '
+                'FROM products_product p LEFT JOIN products_category c ON c.id = p.category_id '
+                'WHERE p.active'
+            )
+            return cursor.rowcount
+
+
+BACKENDS = {
+    LikeSearchBackend.name: LikeSearchBackend,
+    SQLiteFTSBackend.name: SQLiteFTSBackend,
+    PostgresSearchBackend.name: PostgresSearchBackend,
+}
+VENDOR_BACKENDS = {
+    'sqlite': SQLiteFTSBackend,
+    'postgresql': PostgresSearchBackend,
+}
+
+_backend = None
+
+
+def get_search_backend():
+    """Return the configured backend, resolving ``"auto"`` from the database vendor."""
+    global _backend
+    if _backend is None:
+        choice = _search_settings().get('BACKEND', 'auto')
+        if choice == 'auto':
+            backend_cls = VENDOR_BACKENDS.get(connection.vendor, LikeSearchBackend)
+            try:
+                if backend_cls is not LikeSearchBackend and not backend_cls.is_available():
+                    logger.warning("Search index for %s is missing; falling back to LIKE search.", backend_cls.name)
+                    backend_cls = LikeSearchBackend
+            except DatabaseError:
+                logger.exception("Could not inspect search index; falling back to LIKE search.")
+                backend_cls = LikeSearchBackend
+        else:
+            backend_cls = BACKENDS[choice]
+        _backend = backend_cls()
+    return _backend
+
+
+def search_product_ids(query: str, limit: int = None) -> List[int]:
+    """Ranked ids of active products matching ``query``."""
+    if limit is None:
+        limit = int(_search_settings().get('MAX_RESULTS', 500))
+    return get_search_backend().search(query, limit)
+
+
+def normalize_query(query: str, backend=None) -> str:
+    """Canonical form of ``query``: case and spacing never matter, and word
+    order (and repeated words) are dropped when the backend's ranking ignores them.
+    """
+    backend = backend or get_search_backend()
+    if backend.order_sensitive:
+        return ' '.join((query or '').lower().split())
+    return ' '.join(sorted(set(tokenize(query))))
+
+
+def cached_search_results(query: str) -> Tuple[List[int], int]:
+    """``(ranked ids, total matches)`` for ``query``, cached per normalized query and catalog version.
+
+    The ids are capped at ``MAX_RESULTS``; the backend counts the full total
+    only when that cap was reached.
+    """
+    backend = get_search_backend()
+    normalized = normalize_query(query, backend)
+    if not normalized:
+        return [], 0
+    digest = hashlib.md5(normalized.encode()).hexdigest()
+    key = f'catalog:search:{catalog_version()}:{backend.name}:{digest}'
+    results = cache.get(key)
+    if results is None:
+        limit = int(_search_settings().get('MAX_RESULTS', 500))
+        ids = search_product_ids(normalized, limit)
+        total = backend.count(normalized) if len(ids) >= limit else len(ids)
+        results = (ids, total)
+        cache.set(key, results, int(_search_settings().get('CACHE_TIMEOUT', SEARCH_CACHE_TIMEOUT)))
+    return results
+
+
+def cached_search(query: str) -> List[int]:
+    """Ranked ids for ``query`` (at most ``MAX_RESULTS``), see ``cached_search_results``."""
+    return cached_search_results(query)[0]
+
+
+def rank_by_ids(queryset, ids):
+    """Restrict ``queryset`` to ``ids`` and order it by their position in the list."""
+    if not ids:
+        return queryset.none()
+    total = len(ids)
+    return queryset.filter(pk__in=ids).annotate(
+        relevance_score=Case(
+            *[When(pk=pk, then=Value(total - pos)) for pos, pk in enumerate(ids)],
+            default=Value(0),
+            output_field=IntegerField(),
+        )
+    ).order_by('-relevance_score', 'name')
+
+
+def enhanced_search(products, query):
+    """Filter ``products`` to search matches for ``query``, best matches first."""
+    if not query or not query.strip():
+        return products
+    return rank_by_ids(products, cached_search(query))
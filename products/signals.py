@@ -0,0 +1,125 @@
+from django.conf import settings
+from django.contrib.auth.signals import user_logged_in
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from django.utils import timezone
+
+from . import images, listings, reservations, suggest
+from .cart import merge_carts
+from .caching import bump_catalog_version
+from .models import Category, HeroSlide, Product, ProductImage
+from .search import INDEX_BATCH_SIZE, get_search_backend
+
+
+@receiver(post_save, sender=Product)
+def index_product(sender, instance, raw=False, **kwargs):
+    """Keep the full-text index in step with admin/product edits."""
+    if raw:
+        return
+    get_search_backend().index_products([instance])
+    suggest.update_product(instance)
+    listings.sync_products([instance])
+
+
+@receiver(post_delete, sender=Product)
+def unindex_product(sender, instance, **kwargs):
+    get_search_backend().remove_products([instance.pk])
+    suggest.remove_product(instance.pk)
+
+
+@receiver(post_save, sender=Category)
+def index_category(sender, instance, raw=False, created=False, **kwargs):
+    """Category names are part of the search document, so renames reindex their products."""
+    if raw:
+        return
+    suggest.update_category(instance)
+    if created:
+        return
+    listings.sync_category(instance)
+    backend = get_search_backend()
+    batch = []
+    for product in instance.product_set.select_related('category').iterator(chunk_size=INDEX_BATCH_SIZE):
+        batch.append(product)
+        if len(batch) >= INDEX_BATCH_SIZE:
+            backend.index_products(batch)
+            batch = []
+    backend.index_products(batch)
+
+
+@receiver(post_delete, sender=Category)
+def unindex_category(sender, instance, **kwargs):
+    suggest.remove_category(instance.pk)
+    listings.clear_category(instance.slug)
+
+
+@receiver(post_save, sender=ProductImage)
+@receiver(post_delete, sender=ProductImage)
+def refresh_listing_thumbnail(sender, instance, raw=False, **kwargs):
+    """Gallery changes can change a listing's thumbnail.
+
+    Deferred to commit: when a whole product is being deleted its images go
+    first, and re-syncing then would resurrect the listing row.
+    """
+    if raw:
+        return
+    product_id = instance.product_id
+    transaction.on_commit(lambda: listings.resync_product_ids([product_id]))
+
+
+@receiver(post_save, sender=ProductImage)
+@receiver(post_delete, sender=ProductImage)
+def touch_product(sender, instance, raw=False, **kwargs):
+    """Gallery edits change the detail page, so they count as product updates."""
+    if raw:
+        return
+    Product.objects.filter(pk=instance.product_id).update(updated_at=timezone.now())
+
+
+@receiver(post_save, sender=Product)
+@receiver(post_save, sender=ProductImage)
+@receiver(post_save, sender=HeroSlide)
+def render_image_variants(sender, instance, raw=False, **kwargs):
+    """Queue responsive renditions for new uploads; already-rendered images are skipped."""
+    if raw:
+        return
+    preset = {Product: 'product', ProductImage: 'gallery', HeroSlide: 'hero'}[sender]
+    images.schedule(instance.image, preset)
+
+
+@receiver(post_delete, sender=Product)
+@receiver(post_delete, sender=ProductImage)
+@receiver(post_delete, sender=HeroSlide)
+def remove_image_variants(sender, instance, **kwargs):
+    source = images.source_name(instance.image)
+    if source:
+        transaction.on_commit(lambda: images.remove(source))
+
+
+@receiver(post_save, sender=Product)
+@receiver(post_delete, sender=Product)
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+@receiver(post_save, sender=HeroSlide)
+@receiver(post_delete, sender=HeroSlide)
+@receiver(post_save, sender=ProductImage)
+@receiver(post_delete, sender=ProductImage)
+def invalidate_catalog_caches(sender, raw=False, **kwargs):
+    if not raw:
+        bump_catalog_version()
+
+
+@receiver(user_logged_in)
+def merge_cart_on_login(sender, request, user, **kwargs):
+    """With the database cart store, what was added before signing in joins the user's cart."""
+    if request is not None and getattr(settings, 'CART_STORE', 'session') == 'database':
+        merge_carts(request, user)
+
+
+@receiver(post_save, sender=Product)
+def reconcile_flash_stock(sender, instance, raw=False, **kwargs):
+    """Restocking or starting a flash sale resets that product's hold counters."""
+    if raw or not instance.is_flash_sale:
+        return
+    product_id = instance.pk
+    transaction.on_commit(lambda: reservations.reconcile([product_id]))
@@ -0,0 +1,196 @@
+"""In-process, typo-tolerant suggestion index for the search box.
+
+Active product names and category names are split into words and indexed by
+character trigrams, so ``search_suggestions`` never has to touch the database
+and still finds "Samsung" when the shopper types "samsng". The index is built by
+a background thread started with the app and rebuilt there periodically, so no
+request ever waits for a build.
+"""
+import logging
+import threading
+import time
+from collections import Counter, defaultdict
+from typing import Dict, List, Set, Tuple
+
+from django.conf import settings
+from django.db import DatabaseError, connection
+
+from .models import Category, ProductListing
+from .search import tokenize
+
+logger = logging.getLogger(__name__)
+
+MIN_SCORE = 0.45
+
+
+def trigrams(word: str) -> Set[str]:
+    padded = f'  {word} '
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def _similarity(query_word: str, query_grams: Set[str], word: str, grams: Set[str]) -> float:
+    if word.startswith(query_word):
+        return 1.0
+    return 2.0 * len(query_grams & grams) / (len(query_grams) + len(grams))
+
+
+class TrigramIndex:
+    """Trigram postings over short labels keyed by ``(kind, pk)``."""
+
+    def __init__(self):
+        self._labels: Dict[Tuple[str, int], str] = {}
+        self._words: Dict[Tuple[str, int], List[Tuple[str, Set[str]]]] = {}
+        self._postings: Dict[str, Set[Tuple[str, int]]] = defaultdict(set)
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._labels)
+
+    def add(self, key, label):
+        with self._lock:
+            self._discard(key)
+            words = [(w, trigrams(w)) for w in dict.fromkeys(tokenize(label))]
+            if not words:
+                return
+            self._labels[key] = label
+            self._words[key] = words
+            for _, grams in words:
+                for gram in grams:
+                    self._postings[gram].add(key)
+
+    def discard(self, key):
+        with self._lock:
+            self._discard(key)
+
+    def _discard(self, key):
+        if self._labels.pop(key, None) is None:
+            return
+        for _, grams in self._words.pop(key):
+            for gram in grams:
+                keys = self._postings.get(gram)
+                if keys is not None:
+                    keys.discard(key)
+                    if not keys:
+                        del self._postings[gram]
+
+    def search(self, query: str, limit: int = 8) -> List[str]:
+        query_words = [(w, trigrams(w)) for w in tokenize(query)]
+        if not query_words:
+            return []
+        gram_count = sum(len(grams) for _, grams in query_words)
+
+        # Only score entries sharing a reasonable share of the query's trigrams
+        min_hits = max(1, gram_count // 3)
+        scored = []
+        with self._lock:
+            hits = Counter()
+            for _, grams in query_words:
+                for gram in grams:
+                    hits.update(self._postings.get(gram, ()))
+            for key, count in hits.items():
+                if count < min_hits:
+                    continue
+                words = self._words[key]
+                score = sum(
+                    max(_similarity(qw, qg, w, g) for w, g in words) for qw, qg in query_words
+                ) / len(query_words)
+                if score >= MIN_SCORE:
+                    label = self._labels[key]
+                    scored.append((-score, len(label), label))
+
+        results = []
+        for _, _, label in sorted(scored):
+            if label not in results:
+                results.append(label)
+                if len(results) >= limit:
+                    break
+        return results
+
+
+_index = None
+_refresher = None
+_refresher_lock = threading.Lock()
+
+
+def _refresh_interval() -> int:
+    return int((getattr(settings, 'PRODUCT_SEARCH', {}) or {}).get('SUGGEST_REFRESH', 300))
+
+
+def build_index() -> TrigramIndex:
+    index = TrigramIndex()
+    for pk, name in ProductListing.objects.values_list('pk', 'name').iterator(chunk_size=2000):
+        index.add(('p', pk), name)
+    for pk, name in Category.objects.values_list('pk', 'name'):
+        index.add(('c', pk), name)
+    return index
+
+
+def refresh():
+    """Build a fresh index and swap it in; readers keep the old one until then."""
+    global _index
+    _index = build_index()
+
+
+def _refresh_loop():
+    while True:
+        try:
+            refresh()
+        except DatabaseError as exc:
+            # e.g. tables not migrated yet; try again next round
+            logger.warning('Could not build the suggestion index: %s', exc)
+        finally:
+            connection.close()
+        time.sleep(_refresh_interval())
+
+
+def start_refresher():
+    """Start the daemon thread that builds the index now and every ``SUGGEST_REFRESH`` seconds.
+
+    Called from ``ProductsConfig.ready()``; idempotent.
+    """
+    global _refresher
+    with _refresher_lock:
+        if _refresher is None or not _refresher.is_alive():
+            _refresher = threading.Thread(target=_refresh_loop, name='suggest-index', daemon=True)
+            _refresher.start()
+
+
+def get_index() -> TrigramIndex:
+    """The process-wide index, built and rebuilt off the request path.
+
+    Saves in this process update it in place via ``products.signals``; the
+    periodic rebuild picks up edits made by other worker processes. Until the
+    first build finishes this is an empty index.
+    """
+    if _refresher is None or not _refresher.is_alive():
+        # Processes that skipped ready()'s start, or were forked after it, start it here
+        start_refresher()
+    return _index if _index is not None else TrigramIndex()
+
+
+def update_product(product):
+    if _index is None:
+        return
+    if product.active:
+        _index.add(('p', product.pk), product.name)
+    else:
+        _index.discard(('p', product.pk))
+
+
+def remove_product(pk):
+    if _index is not None:
+        _index.discard(('p', pk))
+
+
+def update_category(category):
+    if _index is not None:
+        _index.add(('c', category.pk), category.name)
+
+
+def remove_category(pk):
+    if _index is not None:
+        _index.discard(('c', pk))
+
+
+def suggest(query: str, limit: int = 8) -> List[str]:
+    return get_index().search(query, limit)
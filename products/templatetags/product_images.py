@@ -0,0 +1,87 @@
+"""Template tags that serve ``products.images`` renditions.
+
+    {% load product_images %}
+    {% picture p.thumbnail_url 'card' alt=p.name css_class='card-img-top' %}
+    <img srcset='{% srcset product.image %}' ...>
+    <div style="{% background_image slide.image %}">
+
+Images without renditions yet fall back to the original upload.
+"""
+from django import template
+from django.forms.utils import flatatt
+from django.utils.html import format_html
+
+from products import images
+
+register = template.Library()
+
+SIZES = {
+    'thumb': '120px',
+    'card': '(max-width: 576px) 50vw, (max-width: 992px) 33vw, 25vw',
+    'detail': '(max-width: 768px) 100vw, 50vw',
+    'hero': '100vw',
+}
+
+
+def _original_url(src):
+    return src if isinstance(src, str) else src.url
+
+
+def _renditions(src, fmt=None):
+    source = images.source_name(src)
+    found = images.renditions(source) if source else []
+    return [r for r in found if fmt is None or r['format'] == fmt]
+
+
+def _srcset(renditions):
+    return ', '.join(f"{r['url']} {r['width']}w" for r in renditions)
+
+
+def _closest(renditions, preset):
+    """The rendition made for ``preset``, else the widest one that is not wider."""
+    for r in renditions:
+        if r['variant'] == preset:
+            return r
+    narrower = [r for r in renditions if r['width'] <= images.WIDTHS[preset]]
+    return (narrower or renditions)[-1]
+
+
+@register.simple_tag
+def srcset(src, fmt='webp'):
+    """``srcset`` value listing every rendition of ``src`` in ``fmt``."""
+    if not src:
+        return ''
+    return _srcset(_renditions(src, fmt))
+
+
+@register.simple_tag
+def picture(src, preset='card', alt='', css_class='', sizes=None, img_id=None, loading='lazy'):
+    """``<picture>`` with a WebP source and a JPEG ``<img>`` fallback, sized for ``preset``."""
+    if not src:
+        return ''
+    attrs = {'id': img_id, 'class': css_class or None, 'alt': alt, 'loading': loading, 'decoding': 'async'}
+    jpeg = _renditions(src, 'jpeg')
+    if not jpeg:
+        return format_html('<img src="{}"{}>', _original_url(src), flatatt(attrs))
+    sizes = sizes or SIZES[preset]
+    fallback = _closest(jpeg, preset)
+    attrs.update(srcset=_srcset(jpeg), sizes=sizes, width=fallback['width'], height=fallback['height'])
+    return format_html(
+        '<picture><source type="image/webp" srcset="{}" sizes="{}"><img src="{}"{}></picture>',
+        _srcset(_renditions(src, 'webp')), sizes, fallback['url'], flatatt(attrs),
+    )
+
+
+@register.simple_tag
+def background_image(src, preset='hero'):
+    """Inline CSS for a cover background: the original, then an ``image-set`` of renditions."""
+    if not src:
+        return ''
+    css = f"background-image:url('{_original_url(src)}');"
+    webp, jpeg = _renditions(src, 'webp'), _renditions(src, 'jpeg')
+    if webp and jpeg:
+        # Browsers without image-set() type() support keep the first declaration
+        css += "background-image:image-set(url('{}') type('image/webp'), url('{}') type('image/jpeg'));".format(
+            _closest(webp, preset)['url'], _closest(jpeg, preset)['url'],
+        )
+    return css
@@ -0,0 +1,71 @@
+import re
+from decimal import Decimal
+
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from .models import Category, Product, ProductListing
+from .pagination import SORTS, KeysetPaginator
+
+LOCAL_CACHES = {
+    'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'tests-default'},
+    'shared': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'tests-shared'},
+}
+
+# Plan fragments meaning the listing table is read without an index, per vendor
+SCAN_PATTERNS = {
+    'sqlite': [re.compile(r'SCAN products_productlisting(?! USING)'), re.compile(r'USE TEMP B-TREE FOR ORDER BY')],
+    'postgresql': [re.compile(r'Seq Scan on products_productlisting\b')],
+}
+SAMPLE_VALUES = {
+    'name': 'm',
+    'price': Decimal('100'),
+    'created_at': timezone.now(),
+    'stock': 5,
+}
+
+
+def catalog_queries():
+    """(label, queryset) for every catalog query the storefront issues on a hot path."""
+    active = ProductListing.objects.all()
+    yield 'home: latest', active.filter(is_latest=True)[:8]
+    yield 'home: super sale', active.filter(is_super_sale=True)[:8]
+    yield 'home: flash sale', active.filter(is_flash_sale=True)[:8]
+    yield 'home: mega sale', active.filter(is_mega_sale=True)[:8]
+    for sort in SORTS:
+        paginator = KeysetPaginator(active, sort)
+        yield f'all_products: {sort}, first page', paginator.queryset[:25]
+        position = (SAMPLE_VALUES[paginator.field], 1)
+        yield f'all_products: {sort}, next page', paginator.queryset_after(position)[:25]
+    category = Category.objects.values_list('slug', flat=True).first() or 'default'
+    yield 'all_products: category', KeysetPaginator(active.filter(category_slug=category)).queryset[:25]
+    yield 'search_results: popular products', active.filter(stock__gt=0).order_by('-created_at')[:12]
+
+
+@override_settings(CACHES=LOCAL_CACHES)
+class CatalogQueryPlanTests(TestCase):
+    """Every catalog listing query must be answered from an index, never a table scan."""
+
+    @classmethod
+    def setUpTestData(cls):
+        category = Category.objects.create(name='Phones', slug='phones')
+        for i in range(20):
+            Product.objects.create(
+                sku=f'SKU-{i}', slug=f'product-{i}', name=f'Product {i}', price=Decimal(10 + i),
+                stock=i % 4, category=category, is_latest=i % 2 == 0, is_flash_sale=i % 5 == 0,
+            )
+
+    def test_catalog_queries_use_an_index(self):
+        patterns = SCAN_PATTERNS.get(connection.vendor)
+        if patterns is None:
+            self.skipTest(f'No plan checks defined for the {connection.vendor} backend')
+        if connection.vendor == 'postgresql':
+            # Tiny tables make seq scans look cheap; only an unusable index should produce one
+            with connection.cursor() as cursor:
+                cursor.execute('SET enable_seqscan = off')
+        for label, queryset in catalog_queries():
+            with self.subTest(label):
+                plan = queryset.explain()
+                bad = [line for line in plan.splitlines() if any(p.search(line) for p in patterns)]
+                self.assertEqual(bad, [], f'{label} has no usable index:\n{plan}')
@@ -2,10 +2,16 @@ from django.urls import path
 from . import views, cart_views
 urlpatterns = [
     path('all/', views.all_products, name='all_products'),
+    path('all/page/', views.all_products_page, name='all_products_page'),
     path('product/<slug:slug>/', views.product_detail, name='product_detail'),
     path('cart/add/', cart_views.add_to_cart, name='cart_add'),
     path('cart/', cart_views.view_cart, name='cart_view'),
     path('cart/buy-now/', cart_views.buy_now, name='buy_now'),
     path('cart/remove/', cart_views.remove_from_cart, name='cart_remove'),
     path('cart/update/', cart_views.update_cart, name='cart_update'),
+    path('cart/api/', cart_views.cart_api, name='cart_api'),
+    path('cart/api/add/', cart_views.cart_api_add, name='cart_api_add'),
+    path('cart/api/update/', cart_views.cart_api_update, name='cart_api_update'),
+    path('cart/api/remove/', cart_views.cart_api_remove, name='cart_api_remove'),
+    path('cart/api/batch/', cart_views.cart_api_batch, name='cart_api_batch'),
 ]
@@ -1,124 +1,71 @@
 from django.shortcuts import render, get_object_or_404
 from django.http import JsonResponse
-from .models import Product, HeroSlide, Category
+from django.template.loader import render_to_string
+from django.urls import reverse
+from django.views.decorators.cache import cache_control
+from django.views.decorators.http import condition
+from django.views.decorators.vary import vary_on_cookie
+from .models import Product, ProductListing, Category
 from django.core.cache import cache
-from django.db.models import Q, F, Case, When, IntegerField
-from django.contrib.postgres.search import SearchVector, SearchQuery, SearchRank
-from django.db import connection
-import re
+from .search import cached_search_results, enhanced_search
+from .suggest import suggest
+from .autocomplete import complete
+from .pagination import KeysetPaginator
+from .facets import facet_links, get_facets
+from .caching import home_sections
+from .recommendations import related_listings
+from .conditional import catalog_etag, product_etag
+from analytics.buffer import record_search, record_search_click
 
-def enhanced_search(products, query):
-    """Enhanced search with fuzzy matching and relevance scoring"""
-    if not query or not query.strip():
-        return products
-    
-    query = query.strip().lower()
-    
-    # Split query into individual words
-    query_words = re.findall(r'\b\w+\b', query)
-    
-    if not query_words:
-        return products
-    
-    # Create Q objects for different search strategies
-    search_conditions = Q()
-    
-    # 1. Exact matches (highest priority)
-    exact_match = Q(name__iexact=query) | Q(sku__iexact=query)
-    
-    # 2. Starts with matches (high priority)
-    starts_with = Q(name__istartswith=query) | Q(sku__istartswith=query)
-    
-    # 3. Contains matches (medium priority)
-    contains_match = Q(name__icontains=query) | Q(description__icontains=query) | Q(sku__icontains=query)
-    
-    # 4. Word-based matches (lower priority)
-    word_conditions = Q()
-    for word in query_words:
-        if len(word) > 2:  # Only search for words longer than 2 characters
-            word_conditions |= Q(name__icontains=word) | Q(description__icontains=word)
-    
-    # 5. Category name matches
-    category_match = Q(category__name__icontains=query)
-    
-    # Combine all conditions
-    search_conditions = exact_match | starts_with | contains_match | word_conditions | category_match
-    
-    # Apply search filter
-    filtered_products = products.filter(search_conditions)
-    
-    # Add relevance scoring
-    filtered_products = filtered_products.annotate(
-        relevance_score=Case(
-            # Exact matches get highest score
-            When(name__iexact=query, then=100),
-            When(sku__iexact=query, then=95),
-            
-            # Starts with gets high score
-            When(name__istartswith=query, then=80),
-            When(sku__istartswith=query, then=75),
-            
-            # Contains gets medium score
-            When(name__icontains=query, then=60),
-            When(description__icontains=query, then=40),
-            When(sku__icontains=query, then=50),
-            
-            # Category matches get lower score
-            When(category__name__icontains=query, then=30),
-            
-            # Default score for other matches
-            default=20
-        )
-    ).order_by('-relevance_score', 'name')
-    
-    return filtered_products
+PRODUCTS_PER_PAGE = 24
+SEARCH_RESULTS_LIMIT = 50
 
+@vary_on_cookie
+@cache_control(private=True, no_cache=True)
+@condition(etag_func=catalog_etag)
 def home(request):
     q = request.GET.get('q','')
-    products = Product.objects.filter(active=True)
-    if q:
-        products = enhanced_search(products, q)
-    # filter by flags from navbar buttons
-    if request.GET.get('super'):
-        products = products.filter(is_super_sale=True)
-    if request.GET.get('flash'):
-        products = products.filter(is_flash_sale=True)
-    if request.GET.get('mega'):
-        products = products.filter(is_mega_sale=True)
     category_slug = request.GET.get('category')
-    if category_slug:
-        products = products.filter(category__slug=category_slug)
+    # Section lists are shared by every visitor and cached per catalog version
+    sections = home_sections()
+    products = sections['products']
+    if q or category_slug or any(request.GET.get(flag) for flag in ('super', 'flash', 'mega')):
+        products = ProductListing.objects.all()
+        if q:
+            products = enhanced_search(products, q)
+        # filter by flags from navbar buttons
+        if request.GET.get('super'):
+            products = products.filter(is_super_sale=True)
+        if request.GET.get('flash'):
+            products = products.filter(is_flash_sale=True)
+        if request.GET.get('mega'):
+            products = products.filter(is_mega_sale=True)
+        if category_slug:
+            products = products.filter(category_slug=category_slug)
+        products = products[:50]
 
-    latest_products = Product.objects.filter(active=True, is_latest=True)[:8]
-    super_sale = Product.objects.filter(active=True, is_super_sale=True)[:8]
-    flash_sale = Product.objects.filter(active=True, is_flash_sale=True)[:8]
-    mega_sale = Product.objects.filter(active=True, is_mega_sale=True)[:8]
-    slides = HeroSlide.objects.filter(is_active=True)
-    categories = Category.objects.all()[:12]  # Limit to 12 categories for the grid
-    context = {
-        'products': products[:50],
-        'latest_products': latest_products,
-        'super_sale': super_sale,
-        'flash_sale': flash_sale,
-        'mega_sale': mega_sale,
-        'slides': slides,
-        'categories': categories,
-        'q': q
-    }
+    context = dict(sections, products=products, q=q)
     return render(request, 'products/home.html', context)
 
+@vary_on_cookie
+@cache_control(private=True, no_cache=True)
+@condition(etag_func=product_etag)
 def product_detail(request, slug):
-    p = get_object_or_404(Product.objects.prefetch_related('images'), slug=slug, active=True)
+    p = get_object_or_404(Product.objects.select_related('category').prefetch_related('images'), slug=slug, active=True)
     images = list(p.images.all())
+    if request.GET.get('sq'):
+        # Opened from a search results page
+        record_search_click(request, request.GET['sq'], p)
     return render(request, 'products/detail.html', {
         'product': p,
         'images': images,
+        'related_products': related_listings(p),
     })
 
-def all_products(request):
-    """Display all products with filtering and search"""
+def filter_catalog(request):
+    """Listings narrowed by the search/filter query parameters of ``all_products``."""
     q = request.GET.get('q', '')
-    products = Product.objects.filter(active=True)
+    products = ProductListing.objects.all()
     
     # Enhanced search functionality
     if q:
@@ -127,7 +74,7 @@ def all_products(request):
     # Filter by category
     category_slug = request.GET.get('category')
     if category_slug:
-        products = products.filter(category__slug=category_slug)
+        products = products.filter(category_slug=category_slug)
     
     # Filter by sale types
     if request.GET.get('super'):
@@ -146,58 +93,93 @@ def all_products(request):
     elif stock_filter == 'out_of_stock':
         products = products.filter(stock=0)
     
-    # Ordering
-    order_by = request.GET.get('order_by', 'name')
-    if order_by in ['name', 'price', 'created_at']:
-        products = products.order_by(order_by)
-    elif order_by == 'price_desc':
-        products = products.order_by('-price')
-    elif order_by == 'stock_desc':
-        products = products.order_by('-stock')
+    return products
+
+def _catalog_page(request, products):
+    """Current keyset page of ``products`` plus the URL query for the next one."""
+    paginator = KeysetPaginator(products, request.GET.get('order_by', 'name'), per_page=PRODUCTS_PER_PAGE)
+    page = paginator.page(request.GET.get('cursor'))
+    next_query = None
+    if page.has_next:
+        params = request.GET.copy()
+        params['cursor'] = page.next_cursor
+        next_query = params.urlencode()
+    return page, next_query
+
+@vary_on_cookie
+@cache_control(private=True, no_cache=True)
+@condition(etag_func=catalog_etag)
+def all_products(request):
+    """Display all products with filtering and search"""
+    products = filter_catalog(request)
+    page, next_query = _catalog_page(request, products)
+    facets = get_facets(products, request.GET, 'all_products')
+    if request.GET.get('q') and not request.GET.get('cursor'):
+        record_search(request, request.GET['q'], facets['total'])
     
     context = {
-        'products': products,
-        'q': q,
-        'category_slug': category_slug,
-        'order_by': order_by,
-        'stock_filter': stock_filter,
+        'products': page.object_list,
+        'facets': facet_links(facets, request.GET),
+        'page': page,
+        'next_query': next_query,
+        'products_count': facets['total'],
+        'q': request.GET.get('q', ''),
+        'category_slug': request.GET.get('category'),
+        'order_by': request.GET.get('order_by', 'name'),
+        'stock_filter': request.GET.get('stock'),
     }
     return render(request, 'products/all_products.html', context)
 
+def all_products_page(request):
+    """JSON endpoint for infinite scroll: the next page of ``all_products`` for a cursor."""
+    page, next_query = _catalog_page(request, filter_catalog(request))
+    html = render_to_string('products/product_cards.html', {
+        'products': page.object_list,
+        'next_path': reverse('all_products'),
+        'q': request.GET.get('q', ''),
+    }, request=request)
+    return JsonResponse({
+        'products': [
+            {'sku': p.sku, 'name': p.name, 'slug': p.slug, 'price': str(p.price), 'stock': p.stock}
+            for p in page.object_list
+        ],
+        'html': html,
+        'next_cursor': page.next_cursor,
+        'next_url': f"{reverse('all_products_page')}?{next_query}" if next_query else None,
+    })
+
 def search_suggestions(request):
     """AJAX endpoint for search suggestions"""
     query = request.GET.get('q', '').strip()
     suggestions = []
     
     if len(query) >= 2:  # Only provide suggestions for queries with 2+ characters
-        # Get product name suggestions
-        product_suggestions = Product.objects.filter(
-            active=True,
-            name__icontains=query
-        ).values_list('name', flat=True)[:5]
-        
-        # Get category suggestions
-        category_suggestions = Category.objects.filter(
-            name__icontains=query
-        ).values_list('name', flat=True)[:3]
-        
-        suggestions = list(product_suggestions) + list(category_suggestions)
-        suggestions = list(set(suggestions))[:8]  # Remove duplicates and limit to 8
+        # Popular prefix completions first, then typo-tolerant matches; no database hit
+        suggestions = complete(query, limit=8)
+        if len(suggestions) < 8:
+            for label in suggest(query, limit=8):
+                if label not in suggestions:
+                    suggestions.append(label)
+            suggestions = suggestions[:8]
     
     return JsonResponse({'suggestions': suggestions})
 
 def search_results(request):
     """Dedicated search results page with enhanced functionality"""
     q = request.GET.get('q', '').strip()
-    products = Product.objects.filter(active=True)
+    products = ProductListing.objects.all()[:SEARCH_RESULTS_LIMIT]
     search_results_count = 0
+    facets = None
     
     if q:
-        products = enhanced_search(products, q)
-        search_results_count = products.count()
-        
-        # Add search analytics (optional - for tracking popular searches)
-        # You can implement search analytics here if needed
+        # Ranked ids come from the search cache; the visible rows are one in_bulk lookup
+        ids, search_results_count = cached_search_results(q)
+        listings = ProductListing.objects.in_bulk(ids[:SEARCH_RESULTS_LIMIT])
+        products = [listings[pk] for pk in ids[:SEARCH_RESULTS_LIMIT] if pk in listings]
+        facet_counts = get_facets(ProductListing.objects.filter(pk__in=ids), request.GET, 'search')
+        facets = facet_links(facet_counts, request.GET, base_url=reverse('all_products'))
+        # Buffered; written by a background thread
+        record_search(request, q, search_results_count)
     
     # Get related categories for the search
     related_categories = []
@@ -209,15 +191,15 @@ def search_results(request):
     # Get popular products if no search results
     popular_products = []
     if not q or search_results_count == 0:
-        popular_products = Product.objects.filter(
-            active=True,
+        popular_products = ProductListing.objects.filter(
             stock__gt=0
         ).order_by('-created_at')[:12]
     
     context = {
-        'products': products[:50],  # Limit results for performance
+        'products': products,
         'q': q,
         'search_results_count': search_results_count,
+        'facets': facets,
         'related_categories': related_categories,
         'popular_products': popular_products,
         'has_search': bool(q),
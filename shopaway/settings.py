@@ -51,7 +51,14 @@ TEMPLATES = [
 ]
 WSGI_APPLICATION = 'shopaway.wsgi.application'
 ASGI_APPLICATION = 'routing.application'
-DATABASES = { 'default': { 'ENGINE': 'django.db.backends.sqlite3','NAME': BASE_DIR / 'db.sqlite3' } }
+DATABASES = { 'default': {
+    'ENGINE': 'django.db.backends.sqlite3','NAME': BASE_DIR / 'db.sqlite3',
+    # Transactions take the write lock up front (waiting up to `timeout` seconds)
+    # instead of failing with "database is locked" when a read upgrades to a write
+    'OPTIONS': { 'transaction_mode': 'IMMEDIATE' },
+    # A file, not the in-memory default: concurrent checkout tests need real SQLite locking
+    'TEST': { 'NAME': BASE_DIR / 'test_db.sqlite3' },
+} }
 AUTH_PASSWORD_VALIDATORS = []
 LANGUAGE_CODE = 'en-us'
 TIME_ZONE = 'Asia/Dhaka'
@@ -214,7 +221,19 @@ EMAIL_PORT = int(os.getenv('EMAIL_PORT','587') or 587)
 EMAIL_HOST_USER = os.getenv('EMAIL_HOST_USER','')
 EMAIL_HOST_PASSWORD = os.getenv('EMAIL_HOST_PASSWORD','')
 # Simple cache for speed optimization (local memory cache — swap for redis in prod)
-CACHES = { 'default': { 'BACKEND': 'django.core.cache.backends.locmem.LocMemCache' } }
+# "shared" must be visible to every worker: it holds the catalog version that
+# keys all catalog caches and ETags (products.caching). Redis when REDIS_URL is
+# set, otherwise a file cache shared by the workers on this host.
+REDIS_URL = os.getenv('REDIS_URL', '')
+CACHES = {
+    'default': { 'BACKEND': 'django.core.cache.backends.locmem.LocMemCache' },
+    'shared': (
+        { 'BACKEND': 'django.core.cache.backends.redis.RedisCache', 'LOCATION': REDIS_URL, 'TIMEOUT': None }
+        if REDIS_URL else
+        { 'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+          'LOCATION': str(BASE_DIR / 'var' / 'cache'), 'TIMEOUT': None }
+    ),
+}
 
 # Channels configuration
 CHANNEL_LAYERS = {
@@ -287,3 +306,97 @@ STEADFAST = {
         "payment_method": _env("STEADFAST_DEFAULT_PAYMENT_METHOD", "COD"),
     },
 }
+
+# SSL Commerz payment gateway. SANDBOX picks the sandbox or live endpoint
+# unless BASE_URL is set explicitly
+SSLCOMMERZ = {
+    "STORE_ID": _env("SSLCOMMERZ_STORE_ID", "shopa68e2679c82422"),
+    "STORE_PASSWORD": _env("SSLCOMMERZ_STORE_PASSWORD", "shopa68e2679c82422@ssl"),
+    "SANDBOX": (_env("SSLCOMMERZ_SANDBOX", "True") == "True"),
+    "BASE_URL": _env("SSLCOMMERZ_BASE_URL", ""),
+    # Networking: one pooled keep-alive session per process
+    "CONNECT_TIMEOUT": _env_float("SSLCOMMERZ_CONNECT_TIMEOUT", 3.05),
+    "READ_TIMEOUT": _env_float("SSLCOMMERZ_READ_TIMEOUT", 20.0),
+    "RETRIES": _env_int("SSLCOMMERZ_RETRIES", 2),
+    # First retry waits about BACKOFF seconds (jittered), doubling after that
+    "BACKOFF": _env_float("SSLCOMMERZ_BACKOFF", 0.5),
+    "POOL_SIZE": _env_int("SSLCOMMERZ_POOL_SIZE", 10),
+}
+
+# Product catalog search. "auto" picks SQLite FTS5 or PostgreSQL full-text search
+# from the database vendor; "like" forces the portable icontains fallback.
+PRODUCT_SEARCH = {
+    "BACKEND": _env("PRODUCT_SEARCH_BACKEND", "auto"),
+    "MAX_RESULTS": _env_int("PRODUCT_SEARCH_MAX_RESULTS", 500),
+    # Seconds a ranked result list stays cached (entries also expire with the catalog version)
+    "CACHE_TIMEOUT": _env_int("PRODUCT_SEARCH_CACHE_TIMEOUT", 900),
+    # Seconds before a worker rebuilds its in-memory suggestion index
+    "SUGGEST_REFRESH": _env_int("PRODUCT_SEARCH_SUGGEST_REFRESH", 300),
+    # Shared autocomplete file written by `manage.py build_autocomplete`
+    "AUTOCOMPLETE_PATH": _env("PRODUCT_SEARCH_AUTOCOMPLETE_PATH", str(BASE_DIR / "var" / "autocomplete.idx")),
+    "AUTOCOMPLETE_RELOAD": _env_int("PRODUCT_SEARCH_AUTOCOMPLETE_RELOAD", 30),
+}
+
+# Search events are queued in-process and bulk-inserted by a background thread.
+# With ENABLED off they are written inline instead (handy for debugging).
+ANALYTICS_BUFFER = {
+    "ENABLED": _env("ANALYTICS_BUFFER_ENABLED", "True") == "True",
+    # Flush as soon as this many events are queued...
+    "MAX_EVENTS": _env_int("ANALYTICS_BUFFER_MAX_EVENTS", 200),
+    # ...or at least this often (seconds)
+    "FLUSH_INTERVAL": _env_float("ANALYTICS_BUFFER_FLUSH_INTERVAL", 5.0),
+}
+
+# Responsive image renditions (products.images); uploads are rendered by a
+# per-process thread pool, `manage.py build_image_variants` backfills old media
+IMAGE_VARIANTS = {
+    "ENABLED": _env("IMAGE_VARIANTS_ENABLED", "True") == "True",
+    "WORKERS": _env_int("IMAGE_VARIANTS_WORKERS", 2),
+    "WEBP_QUALITY": _env_int("IMAGE_VARIANTS_WEBP_QUALITY", 80),
+    "JPEG_QUALITY": _env_int("IMAGE_VARIANTS_JPEG_QUALITY", 82),
+}
+
+# Where carts live: "session" keeps the whole cart in the session; "database"
+# stores it in StoredCart/StoredCartLine rows (shared across devices, merged on login)
+CART_STORE = _env("CART_STORE", "session")
+
+# Flash-sale holds (products.reservations): adding an is_flash_sale product to a
+# cart holds the units for HOLD_SECONDS; `manage.py reconcile_flash_stock`
+# returns expired holds to sale. The hold counters live in the "shared" cache
+# and need Redis (REDIS_URL) to be race-free across workers
+FLASH_SALE = {
+    "HOLD_SECONDS": _env_int("FLASH_SALE_HOLD_SECONDS", 600),
+}
+
+# Duplicate-order window (orders.dedup). TRUST_CACHE lets a cache miss skip the
+# database; only enable it with a cache shared by all workers
+ORDER_DEDUP = {
+    "WINDOW_SECONDS": _env_int("ORDER_DEDUP_WINDOW_SECONDS", 60 * 60 * 24),
+    "TRUST_CACHE": _env("ORDER_DEDUP_TRUST_CACHE", "False") == "True",
+}
+
+# Replays of checkout / payment callbacks with the same idempotency key within
+# this window get the stored response instead of running again (orders.idempotency)
+ORDER_IDEMPOTENCY = {
+    "WINDOW_SECONDS": _env_int("ORDER_IDEMPOTENCY_WINDOW_SECONDS", 60 * 60 * 24),
+}
+
+# Transactional email is queued in EmailOutbox and sent by `manage.py run_outbox`
+EMAIL_OUTBOX = {
+    "BATCH_SIZE": _env_int("EMAIL_OUTBOX_BATCH_SIZE", 50),
+    "MAX_ATTEMPTS": _env_int("EMAIL_OUTBOX_MAX_ATTEMPTS", 8),
+    # Retries wait RETRY_BASE_SECONDS, then double each time (capped at 6 hours)
+    "RETRY_BASE_SECONDS": _env_int("EMAIL_OUTBOX_RETRY_BASE_SECONDS", 30),
+    # A worker's claim on a batch; unsent messages of a crashed worker come due after it
+    "LEASE_SECONDS": _env_int("EMAIL_OUTBOX_LEASE_SECONDS", 600),
+}
+
+# Gateway payment notifications are validated by `manage.py process_payment_notifications`
+PAYMENT_NOTIFICATIONS = {
+    "BATCH_SIZE": _env_int("PAYMENT_NOTIFICATIONS_BATCH_SIZE", 20),
+    "MAX_ATTEMPTS": _env_int("PAYMENT_NOTIFICATIONS_MAX_ATTEMPTS", 8),
+    # Retries wait RETRY_BASE_SECONDS, then double each time (capped at 1 hour)
+    "RETRY_BASE_SECONDS": _env_int("PAYMENT_NOTIFICATIONS_RETRY_BASE_SECONDS", 15),
+    # A worker's claim on a batch; unsettled notifications of a crashed worker come due after it
+    "LEASE_SECONDS": _env_int("PAYMENT_NOTIFICATIONS_LEASE_SECONDS", 900),
+}
@@ -0,0 +1,69 @@
+// AJAX cart for ShopAway
+// Add / update / remove forms are sent to the JSON cart API instead of
+// posting and reloading; without JS the forms still post as before.
+(function() {
+    'use strict';
+
+    const script = document.currentScript;
+    const routes = JSON.parse(script.getAttribute('data-routes') || '{}');
+
+    function apiUrl(form) {
+        const path = new URL(form.action, window.location.href).pathname;
+        return routes[path];
+    }
+
+    function setText(selector, value) {
+        document.querySelectorAll(selector).forEach(el => { el.textContent = value; });
+    }
+
+    function applySummary(data) {
+        setText('[data-cart-count]', data.count);
+        document.querySelectorAll('[data-cart-badge]').forEach(el => {
+            el.classList.toggle('d-none', !data.count);
+        });
+        setText('[data-cart-total]', data.total);
+        setText('[data-cart-lines]', data.lines.length);
+        if (data.html) {
+            const rows = document.querySelector('[data-cart-rows]');
+            const cards = document.querySelector('[data-cart-cards]');
+            if (rows) rows.innerHTML = data.html.rows;
+            if (cards) cards.innerHTML = data.html.cards;
+        }
+    }
+
+    function flash(button) {
+        if (!button) return;
+        button.classList.add('disabled');
+        setTimeout(() => button.classList.remove('disabled'), 400);
+    }
+
+    document.addEventListener('submit', function(event) {
+        const form = event.target;
+        let url = apiUrl(form);
+        if (!url || !window.fetch) return;
+        event.preventDefault();
+
+        // On the cart page the lines are re-rendered server-side
+        const onCartPage = document.querySelector('[data-cart-rows]');
+        if (onCartPage) url += '?fragment=1';
+        const button = event.submitter || form.querySelector('button');
+        flash(button);
+
+        fetch(url, {
+            method: 'POST',
+            body: new FormData(form),
+            credentials: 'same-origin',
+            headers: { 'X-Requested-With': 'XMLHttpRequest' }
+        })
+            // 409: a flash-sale item ran out; the body still carries the cart summary
+            .then(response => (response.ok || response.status === 409) ? response.json() : Promise.reject(response))
+            .then(data => {
+                applySummary(data);
+                if (data.error) window.alert(data.error);
+                // The empty-cart page has no checkout form to update
+                if (onCartPage && !data.lines.length) window.location.reload();
+            })
+            // Fall back to a normal post if the API is unavailable
+            .catch(() => form.submit());
+    });
+})();